@@ -0,0 +1,262 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+from controllers.mamdani import MamdaniController
+from controllers.native import DEFUZZIFIERS
+from controllers.sugeno import SugenoController
+from profiling import format_time
+from simulation import GreenhouseSimulation
+
+# Every result is a time in seconds (lower is better), so a regression is always "got bigger".
+DEFAULT_CONFIG = {
+    'seed': 0,
+    'warmup': 5,
+    'mamdani_calls': 100,     # skfuzzy single calls are slow, keep this modest
+    'sugeno_calls': 2000,
+    'batch_sizes': [1, 100, 10000],
+    'batch_repeats': 5,
+    'construction_repeats': 5,
+    'sim_tests': 2,
+    'sim_steps': 10,
+    'sim_repeats': 5,
+    'defuzz_batch': 10000,
+    'defuzz_points': 200      # accuracy reference points, evaluated with skfuzzy compute()
+}
+
+QUICK_CONFIG = dict(DEFAULT_CONFIG, mamdani_calls=20, sugeno_calls=200, batch_sizes=[1, 1000], batch_repeats=2,
+                    construction_repeats=3, sim_tests=1, sim_steps=5, sim_repeats=3, defuzz_batch=1000, defuzz_points=50)
+
+def random_inputs(n, seed):
+    """n distinct (temp, humidity, growth) inputs; skfuzzy caches repeated inputs, so never reuse one."""
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0, 50, n), rng.uniform(0, 100, n), rng.uniform(0, 100, n)
+
+def percentiles(samples):
+    samples = np.asarray(samples)
+    return {
+        'p50': float(np.percentile(samples, 50)),
+        'p95': float(np.percentile(samples, 95)),
+        'p99': float(np.percentile(samples, 99))
+    }
+
+def bench_latency(controller, calls, warmup, seed):
+    """Per-call latency distribution of controller.compute on distinct random inputs."""
+    temps, hums, growths = random_inputs(calls + warmup, seed)
+    samples = []
+    for i in range(calls + warmup):
+        start = time.perf_counter()
+        controller.compute(temps[i], hums[i], growths[i])
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed)
+    return percentiles(samples)
+
+def bench_batch(controller, n, repeats, warmup, seed):
+    """Median wall time of one compute_batch call over n inputs."""
+    temps, hums, growths = random_inputs(n, seed)
+    for _ in range(min(warmup, 2)):
+        controller.compute_batch(temps, hums, growths)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        controller.compute_batch(temps, hums, growths)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+def bench_construction(factory, repeats, warmup):
+    """Median wall time of factory(), after warmup calls (imports, first-use caches)."""
+    for _ in range(min(warmup, 2)):
+        factory()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        factory()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+def bench_defuzz_accuracy(controller, reference, num_points, seed):
+    """
+    Max / mean absolute error of controller.compute_batch vs reference outputs
+    ({'heater_fan': array, 'misting': array} on random_inputs(num_points, seed)).
+    """
+    out = controller.compute_batch(*random_inputs(num_points, seed))
+    return {
+        name: {
+            'max': float(np.max(np.abs(out[name] - reference[name]))),
+            'mean': float(np.mean(np.abs(out[name] - reference[name])))
+        }
+        for name in ('heater_fan', 'misting')
+    }
+
+def skfuzzy_reference(num_points, seed):
+    """skfuzzy centroid outputs (MamdaniController.compute) on random_inputs(num_points, seed)."""
+    controller = MamdaniController()
+    temps, hums, growths = random_inputs(num_points, seed)
+    outputs = [controller.compute(t, h, g) for t, h, g in zip(temps, hums, growths)]
+    return {name: np.array([out[name] for out in outputs], dtype=float) for name in ('heater_fan', 'misting')}
+
+def bench_simulation(sim, num_tests, steps_per_test, repeats, warmup, seed):
+    """
+    Median wall time of a full run_random_tests (output suppressed), after a warmup run.
+    Run i is seeded with seed + i: every benchmark run simulates the same scenarios, but no
+    two runs repeat inputs that skfuzzy would answer from its cache.
+    """
+    warmup = min(warmup, 1)
+    samples = []
+    for i in range(warmup + repeats):
+        start = time.perf_counter()
+        sim.run_random_tests(num_tests=num_tests, steps_per_test=steps_per_test, seed=seed + i)
+        if i >= warmup:
+            samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+def run_benchmarks(config=DEFAULT_CONFIG, log=print):
+    """
+    Runs the whole suite and returns {'meta': ..., 'results': {name: seconds}, 'accuracy': ...}.
+    accuracy holds, per Mamdani defuzzifier, the max / mean absolute error per output
+    against the skfuzzy centroid.
+    """
+    results = {}
+    accuracy = {}
+
+    log("Construction...")
+    results['construction.mamdani'] = bench_construction(MamdaniController, config['construction_repeats'], config['warmup'])
+    results['construction.sugeno'] = bench_construction(SugenoController, config['construction_repeats'], config['warmup'])
+    # skfuzzy objects are built lazily on the first compute(); time that separately
+    results['construction.mamdani_skfuzzy'] = bench_construction(
+        lambda: MamdaniController()._build_skfuzzy(), config['construction_repeats'], config['warmup']
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = os.path.join(tmp, 'mamdani.npz')
+        MamdaniController().save(artifact)
+        results['construction.mamdani_artifact'] = bench_construction(
+            lambda: MamdaniController.load(artifact), config['construction_repeats'], config['warmup']
+        )
+
+    mamdani = MamdaniController()
+    sugeno = SugenoController()
+    controllers = [('mamdani', mamdani), ('sugeno', sugeno)]
+
+    log("Single-call latency...")
+    for name, controller in controllers:
+        calls = config[f'{name}_calls']
+        for stat, value in bench_latency(controller, calls, config['warmup'], config['seed']).items():
+            results[f'latency.{name}.{stat}'] = value
+
+    log("Batch throughput...")
+    for name, controller in controllers:
+        for n in config['batch_sizes']:
+            results[f'batch.{name}.n{n}'] = bench_batch(controller, n, config['batch_repeats'], config['warmup'], config['seed'])
+
+    log("Defuzzification...")
+    reference = skfuzzy_reference(config['defuzz_points'], config['seed'])
+    for method in DEFUZZIFIERS:
+        controller = MamdaniController(defuzzifier=method)
+        n = config['defuzz_batch']
+        results[f'batch.mamdani_{method}.n{n}'] = bench_batch(controller, n, config['batch_repeats'], config['warmup'], config['seed'])
+        accuracy[method] = bench_defuzz_accuracy(controller, reference, config['defuzz_points'], config['seed'])
+
+    log("Simulation...")
+    sim = GreenhouseSimulation(mamdani, sugeno)
+    results['simulation.run_random_tests'] = _quiet(
+        bench_simulation, sim, config['sim_tests'], config['sim_steps'], config['sim_repeats'], config['warmup'], config['seed']
+    )
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'config': config
+        },
+        'results': results,
+        'accuracy': accuracy
+    }
+
+def compare(results, baseline, threshold):
+    """
+    Regressions of results vs baseline (both {'results': {name: seconds}}): entries that
+    got slower by more than threshold (0.2 = 20 %). Returns a list of (name, baseline, current, ratio).
+    """
+    regressions = []
+    for name, base in baseline['results'].items():
+        current = results['results'].get(name)
+        if current is None or base <= 0:
+            continue
+        ratio = current / base
+        if ratio > 1.0 + threshold:
+            regressions.append((name, base, current, ratio))
+    return regressions
+
+def print_table(report, baseline=None):
+    print(f"{'Benchmark':<40} | {'Time':>12} | {'Throughput':>14} | {'vs baseline':>11}")
+    print("-" * 86)
+    for name, value in report['results'].items():
+        throughput = ''
+        if name.startswith('batch.'):
+            n = int(name.rsplit('.n', 1)[1])
+            throughput = f"{n / value:,.0f}/s"
+        change = ''
+        if baseline and name in baseline['results'] and baseline['results'][name] > 0:
+            change = f"{value / baseline['results'][name] - 1:+.1%}"
+        print(f"{name:<40} | {format_time(value):>12} | {throughput:>14} | {change:>11}")
+
+def print_accuracy(report):
+    print(f"{'Defuzzifier vs skfuzzy centroid':<32} | {'HF max':>10} | {'HF mean':>10} | {'Mist max':>10} | {'Mist mean':>10}")
+    print("-" * 84)
+    for method, errors in report.get('accuracy', {}).items():
+        hf, mist = errors['heater_fan'], errors['misting']
+        print(f"{method:<32} | {hf['max']:>10.4g} | {hf['mean']:>10.4g} | {mist['max']:>10.4g} | {mist['mean']:>10.4g}")
+
+def _quiet(fn, *args):
+    # run_random_tests prints progress; keep the benchmark output clean
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark controller and simulation hot paths.")
+    parser.add_argument('--output', '-o', help="write results as JSON to this file")
+    parser.add_argument('--baseline', '-b', help="JSON file from a previous run to compare against")
+    parser.add_argument('--threshold', '-t', type=float, default=0.2,
+                        help="relative slowdown flagged as a regression (default 0.2 = 20%%)")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes for a fast smoke run")
+    parser.add_argument('--seed', type=int, default=DEFAULT_CONFIG['seed'])
+    args = parser.parse_args(argv)
+
+    config = dict(QUICK_CONFIG if args.quick else DEFAULT_CONFIG, seed=args.seed)
+    report = run_benchmarks(config)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print()
+    print_table(report, baseline)
+    print()
+    print_accuracy(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if baseline:
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for name, base, current, ratio in regressions:
+                print(f"  {name}: {format_time(base)} -> {format_time(current)} (x{ratio:.2f})")
+            return 1
+        print(f"\nNo regressions above {args.threshold:.0%}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
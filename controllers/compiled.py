@@ -0,0 +1,151 @@
+
+import numpy as np
+from model.variables import TEMP_RANGE, HUMIDITY_RANGE, GROWTH_RANGE
+
+# Default grid resolution (points per axis) for temp, humidity, growth stage.
+DEFAULT_RESOLUTION = (51, 101, 21)
+
+class CompiledMamdaniController:
+    """
+    Lookup-table version of the Mamdani controller.
+    The full control surface is sampled once on a dense (temp, humidity, growth) grid
+    and queries are answered by trilinear interpolation, so no skfuzzy work happens per call.
+    """
+    def __init__(self, axes, surface, max_error=None):
+        # axes: (temp_axis, humidity_axis, growth_axis), each increasing
+        # surface: array (len(temp_axis), len(humidity_axis), len(growth_axis), 2) -> [heater_fan, misting]
+        self.axes = tuple(np.asarray(a, dtype=float) for a in axes)
+        self.surface = np.asarray(surface, dtype=float)
+        # Largest absolute interpolation error per output found against the exact controller
+        # (see measure_error); an estimate from sampled inputs, not a guaranteed bound
+        self.max_error = max_error
+
+    @classmethod
+    def build(cls, controller, resolution=DEFAULT_RESOLUTION, validation_points=10000, seed=0, chunk_size=4096):
+        """
+        Samples the controller's control surface over the universes from model/variables.py.
+        resolution is the number of grid points per input, or a single int used for all three.
+        max_error is measured by measure_error() (every cell center plus validation_points random
+        inputs); pass validation_points=0 to skip the measurement.
+        """
+        if np.isscalar(resolution):
+            resolution = (resolution, resolution, resolution)
+        if min(resolution) < 2:
+            raise ValueError("Grid resolution needs at least 2 points per axis.")
+
+        axes = tuple(
+            np.linspace(universe.min(), universe.max(), n)
+            for universe, n in zip((TEMP_RANGE, HUMIDITY_RANGE, GROWTH_RANGE), resolution)
+        )
+        t, h, g = np.meshgrid(*axes, indexing='ij')
+        exact = _evaluate(controller, t.ravel(), h.ravel(), g.ravel(), chunk_size)
+        surface = np.stack([exact['heater_fan'], exact['misting']], axis=-1).reshape(tuple(resolution) + (2,))
+
+        compiled = cls(axes, surface)
+        if validation_points:
+            compiled.max_error = compiled.measure_error(controller, validation_points, seed, chunk_size)
+        return compiled
+
+    def measure_error(self, controller, num_points=10000, seed=0, chunk_size=4096):
+        """
+        Largest absolute error of the interpolated surface vs the exact controller, over the
+        center of every grid cell (where interpolation is furthest from the samples) plus
+        num_points random inputs. The control surface has steep ridges and jumps between
+        grid points, so this is an estimate of the worst case, not a bound: inputs close
+        to a jump can be off by more.
+        """
+        centers = [(axis[:-1] + axis[1:]) / 2 for axis in self.axes]
+        t, h, g = (c.ravel() for c in np.meshgrid(*centers, indexing='ij'))
+
+        rng = np.random.default_rng(seed)
+        t = np.concatenate([t, rng.uniform(self.axes[0][0], self.axes[0][-1], num_points)])
+        h = np.concatenate([h, rng.uniform(self.axes[1][0], self.axes[1][-1], num_points)])
+        g = np.concatenate([g, rng.uniform(self.axes[2][0], self.axes[2][-1], num_points)])
+
+        exact = _evaluate(controller, t, h, g, chunk_size)
+        approx = self.compute_batch(t, h, g)
+        return {
+            'heater_fan': float(np.max(np.abs(approx['heater_fan'] - exact['heater_fan']))),
+            'misting': float(np.max(np.abs(approx['misting'] - exact['misting'])))
+        }
+
+    def compute(self, temp_input, humidity_input, growth_input):
+        out = self.compute_batch(temp_input, humidity_input, growth_input)
+        return {
+            'heater_fan': out['heater_fan'][0],
+            'misting': out['misting'][0]
+        }
+
+    def compute_batch(self, temps, hums, growths):
+        """Trilinear interpolation of the sampled surface for N inputs (clipped to the grid bounds)."""
+        temps, hums, growths = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(temps, dtype=float)),
+            np.atleast_1d(np.asarray(hums, dtype=float)),
+            np.atleast_1d(np.asarray(growths, dtype=float))
+        )
+
+        cells = []
+        for axis, values in zip(self.axes, (temps, hums, growths)):
+            values = np.clip(values, axis[0], axis[-1])
+            idx = np.clip(np.searchsorted(axis, values, side='right') - 1, 0, len(axis) - 2)
+            frac = (values - axis[idx]) / (axis[idx + 1] - axis[idx])
+            cells.append((idx, frac[:, None]))
+        (i, fi), (j, fj), (k, fk) = cells
+
+        s = self.surface
+        # Interpolate along growth, then humidity, then temperature
+        c00 = s[i, j, k] * (1 - fk) + s[i, j, k + 1] * fk
+        c01 = s[i, j + 1, k] * (1 - fk) + s[i, j + 1, k + 1] * fk
+        c10 = s[i + 1, j, k] * (1 - fk) + s[i + 1, j, k + 1] * fk
+        c11 = s[i + 1, j + 1, k] * (1 - fk) + s[i + 1, j + 1, k + 1] * fk
+        c0 = c00 * (1 - fj) + c01 * fj
+        c1 = c10 * (1 - fj) + c11 * fj
+        out = c0 * (1 - fi) + c1 * fi
+
+        return {
+            'heater_fan': out[:, 0],
+            'misting': out[:, 1]
+        }
+
+    def to_arrays(self):
+        """Grid axes, surface and max_error as name -> array (the save() layout)."""
+        max_error = self.max_error or {}
+        return {
+            'temp_axis': self.axes[0],
+            'humidity_axis': self.axes[1],
+            'growth_axis': self.axes[2],
+            'surface': self.surface,
+            'max_error': np.array([max_error.get('heater_fan', np.nan), max_error.get('misting', np.nan)])
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Inverse of to_arrays; float64 axes and surface are used as given (no copy)."""
+        max_error = None
+        if not np.isnan(arrays['max_error']).all():
+            max_error = {'heater_fan': float(arrays['max_error'][0]), 'misting': float(arrays['max_error'][1])}
+        return cls(
+            (arrays['temp_axis'], arrays['humidity_axis'], arrays['growth_axis']),
+            arrays['surface'],
+            max_error=max_error
+        )
+
+    def save(self, path):
+        """Persists the grid so later processes can skip the build."""
+        np.savez_compressed(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls.from_arrays({name: data[name] for name in data.files})
+
+def _evaluate(controller, temps, hums, growths, chunk_size):
+    """Runs the exact controller over many inputs, chunk by chunk."""
+    heater_fan = np.empty(len(temps))
+    misting = np.empty(len(temps))
+    for start in range(0, len(temps), chunk_size):
+        stop = start + chunk_size
+        res = controller.compute_batch(temps[start:stop], hums[start:stop], growths[start:stop])
+        heater_fan[start:stop] = res['heater_fan']
+        misting[start:stop] = res['misting']
+    return {'heater_fan': heater_fan, 'misting': misting}
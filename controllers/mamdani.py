@@ -1,66 +1,261 @@
 
+import threading
 import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
-from model.variables import TEMP_RANGE, HUMIDITY_RANGE, GROWTH_RANGE, TEMP_CONTROL_RANGE, MISTING_RANGE, generate_membership_functions
-from controllers.rules import define_rules
+import profiling
+from model.variables import TEMP_RANGE, HUMIDITY_RANGE, GROWTH_RANGE, TEMP_CONTROL_RANGE, MISTING_RANGE, generate_membership_functions, sample_trimf
+from controllers.rules import define_rules, DEFAULT_RULE_BASE, RuleBase, INPUT_VARIABLES, OUTPUT_VARIABLES, INPUT_LABELS, HEATER_FAN_LABELS, MISTING_LABELS
+from controllers.native import NativeMamdaniEngine
+from controllers.compiled import CompiledMamdaniController, DEFAULT_RESOLUTION
 
 class MamdaniController:
-    def __init__(self):
+    # skfuzzy objects, only built when first accessed (see _build_skfuzzy)
+    SKFUZZY_ATTRIBUTES = ('temp', 'humidity', 'growth_stage', 'heater_fan', 'misting', 'rules', 'ctrl_system', 'simulation')
+
+    def __init__(self, rule_base=None, variables=None, defuzzifier='centroid'):
+        # Declarative rule table shared with the Sugeno controller (see controllers/rules.py)
+        self.rule_base = DEFAULT_RULE_BASE if rule_base is None else rule_base
+
+        # Sampled MFs of every input/output: name -> (universe, labels, mf matrix (labels, len(universe)))
+        # Precomputed variables (e.g. from load()) skip the MF generation.
+        self.variables = default_variables() if variables is None else variables
+
+        # Defuzzification method, one of controllers.native.DEFUZZIFIERS. compute() uses the
+        # skfuzzy equivalent (its centroid for analytic_centroid).
+        self.defuzzifier = defuzzifier
+
+        # Native vectorized engine compiled from the same variables and rule base.
+        # Needs no skfuzzy, so constructing the controller stays cheap.
+        self.engine = NativeMamdaniEngine.from_rule_base(
+            self.rule_base,
+            [(name, self.variables[name][0], self.variables[name][2]) for name in INPUT_VARIABLES],
+            [(name, self.variables[name][0], self.variables[name][2]) for name in OUTPUT_VARIABLES],
+            defuzzifier=defuzzifier
+        )
+
+        # Hot reload (update_membership_functions / update_rules): updates are serialized by
+        # _update_lock and publish new state by attribute assignment. The engine is never
+        # modified once built, so compute_batch needs no lock; compute() holds _compute_lock
+        # because the skfuzzy simulation is shared, mutable state.
+        self._update_lock = threading.RLock()
+        self._compute_lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks cannot be pickled; skfuzzy objects are rebuilt on first use
+        skip = ('_update_lock', '_compute_lock') + MamdaniController.SKFUZZY_ATTRIBUTES
+        return {key: value for key, value in self.__dict__.items() if key not in skip}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._update_lock = threading.RLock()
+        self._compute_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Only reached when normal lookup fails, i.e. before the skfuzzy objects exist
+        if name in MamdaniController.SKFUZZY_ATTRIBUTES:
+            with self._update_lock:
+                # Another thread may have built them while this one waited
+                if name not in self.__dict__:
+                    with profiling.stage('mamdani.build_skfuzzy'):
+                        self.__dict__.update(self._build_skfuzzy())
+            return self.__dict__[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def _build_skfuzzy(self, rule_base=None):
+        """
+        Builds the skfuzzy variables, rules and ControlSystemSimulation used by compute()
+        (from rule_base if given), returned as attribute name -> object.
+        """
+        from skfuzzy import control as ctrl
+
+        rule_base = self.rule_base if rule_base is None else rule_base
+        objects = {}
         # Antecedents
-        self.temp = ctrl.Antecedent(TEMP_RANGE, 'temp')
-        self.humidity = ctrl.Antecedent(HUMIDITY_RANGE, 'humidity')
-        self.growth_stage = ctrl.Antecedent(GROWTH_RANGE, 'growth_stage')
-        
+        for name in INPUT_VARIABLES:
+            objects[name] = ctrl.Antecedent(self.variables[name][0], name)
+
         # Consequents
-        self.heater_fan = ctrl.Consequent(TEMP_CONTROL_RANGE, 'heater_fan')
-        self.misting = ctrl.Consequent(MISTING_RANGE, 'misting')
-        
-        # Determine membership functions (Initial Default)
-        # We re-generate them here or load them. For now, re-generating to ensure they are attached to the Antecedent objects appropriately if needed, 
-        # though skfuzzy usually wants them assigned to the .automf() or .universe. 
-        # We will use the custom dictionary we made in variables.py but apply them to the skfuzzy objects.
-        
-        self._apply_membership_functions(self.temp, TEMP_RANGE)
-        self._apply_membership_functions(self.humidity, HUMIDITY_RANGE)
-        self._apply_membership_functions(self.growth_stage, GROWTH_RANGE)
-        
-        self._apply_membership_functions(self.heater_fan, TEMP_CONTROL_RANGE, labels=['Cooling_Strong', 'Cooling_Weak', 'Off', 'Heating_Weak', 'Heating_Strong'])
-        self._apply_membership_functions(self.misting, MISTING_RANGE, labels=['Off', 'Low', 'Medium', 'High', 'Max'])
-        
+        for name in OUTPUT_VARIABLES:
+            objects[name] = ctrl.Consequent(self.variables[name][0], name)
+            objects[name].defuzzify_method = 'centroid' if self.defuzzifier == 'analytic_centroid' else self.defuzzifier
+
+        for name in INPUT_VARIABLES + OUTPUT_VARIABLES:
+            self._apply_membership_functions(objects[name])
+
         # Rules
-        self.rules = define_rules(self.temp, self.humidity, self.growth_stage, self.heater_fan, self.misting)
-        
+        objects['rules'] = define_rules(*(objects[name] for name in INPUT_VARIABLES + OUTPUT_VARIABLES), rule_base)
+
         # Control System
-        self.ctrl_system = ctrl.ControlSystem(self.rules)
-        self.simulation = ctrl.ControlSystemSimulation(self.ctrl_system)
-        
-    def _apply_membership_functions(self, fuzzy_var, range_array, labels=['Very Low', 'Low', 'Ideal', 'High', 'Very High']):
-        mfs = generate_membership_functions(range_array, labels)
-        for label, mf in mfs.items():
+        objects['ctrl_system'] = ctrl.ControlSystem(objects['rules'])
+        objects['simulation'] = ctrl.ControlSystemSimulation(objects['ctrl_system'])
+        return objects
+
+    def _apply_membership_functions(self, fuzzy_var):
+        _, labels, mfs = self.variables[fuzzy_var.label]
+        for label, mf in zip(labels, mfs):
             fuzzy_var[label] = mf
 
     def compute(self, temp_input, humidity_input, growth_input):
-        self.simulation.input['temp'] = temp_input
-        self.simulation.input['humidity'] = humidity_input
-        self.simulation.input['growth_stage'] = growth_input
-        
-        try:
-            self.simulation.compute()
+        if self.defuzzifier != 'centroid':
+            # Only the centroid is computed the same way by skfuzzy and the native engine
+            # (see DEFUZZIFIERS), so the other methods always go through the engine
+            out = self.engine.compute_batch(temp_input, humidity_input, growth_input)
             return {
-                'heater_fan': self.simulation.output['heater_fan'],
-                'misting': self.simulation.output['misting']
+                'heater_fan': out['heater_fan'][0],
+                'misting': out['misting'][0]
             }
-        except Exception as e:
-            # Fallback if rule not fired (though we have defaults/should ideally cover space)
-            print(f"Warning: No rule fired for inputs {temp_input}, {humidity_input}, {growth_input}. Error: {e}")
-            return {'heater_fan': 0, 'misting': 0}
+
+        # First use builds the skfuzzy objects, before taking the compute lock
+        self.simulation
+        with self._compute_lock:
+            simulation = self.simulation
+            simulation.input['temp'] = temp_input
+            simulation.input['humidity'] = humidity_input
+            simulation.input['growth_stage'] = growth_input
+
+            try:
+                # skfuzzy fuzzifies, fires rules and defuzzifies in one call; the native
+                # engine behind compute_batch reports those stages separately
+                with profiling.stage('mamdani.skfuzzy'):
+                    simulation.compute()
+                return {
+                    'heater_fan': simulation.output['heater_fan'],
+                    'misting': simulation.output['misting']
+                }
+            except Exception as e:
+                # Fallback if rule not fired (though we have defaults/should ideally cover space)
+                print(f"Warning: No rule fired for inputs {temp_input}, {humidity_input}, {growth_input}. Error: {e}")
+                return {'heater_fan': 0, 'misting': 0}
+
+    def compute_batch(self, temps, hums, growths):
+        """
+        Evaluates N input triples with the native NumPy engine (no ControlSystemSimulation).
+        With the default 'centroid' defuzzifier this matches the skfuzzy result of compute()
+        within floating point tolerance; compute() evaluates the other defuzzifiers with this
+        engine as well. Returns 0 where no rule fires.
+        The engine is read once, so a concurrent update never shows up halfway through a call.
+        """
+        return self.engine.compute_batch(temps, hums, growths)
+
+    def compile(self, resolution=DEFAULT_RESOLUTION, validation_points=10000, seed=0):
+        """
+        Samples this controller's control surface once and returns a CompiledMamdaniController
+        that answers queries by trilinear interpolation. Its max_error holds the largest
+        interpolation error found at the cell centers and random inputs (an estimate, not a
+        bound); use .save()/.load() to reuse the grid across processes.
+        """
+        return CompiledMamdaniController.build(self, resolution=resolution, validation_points=validation_points, seed=seed)
+
+    def to_arrays(self):
+        """Rule base and sampled MFs as name -> array (the save() / controllers.shared layout)."""
+        arrays = {
+            'rule_antecedents': self.rule_base.antecedents,
+            'rule_consequents': self.rule_base.consequents,
+            'defuzzifier': np.array(self.defuzzifier)
+        }
+        for name, (universe, labels, mfs) in self.variables.items():
+            arrays[f'{name}_universe'] = universe
+            arrays[f'{name}_labels'] = np.array(labels)
+            arrays[f'{name}_mfs'] = mfs
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Inverse of to_arrays; the MF matrices are used as given (no copy)."""
+        variables = {
+            name: (arrays[f'{name}_universe'], [str(l) for l in arrays[f'{name}_labels']], arrays[f'{name}_mfs'])
+            for name in INPUT_VARIABLES + OUTPUT_VARIABLES
+        }
+        defuzzifier = str(arrays['defuzzifier']) if 'defuzzifier' in arrays else 'centroid'
+        return cls(RuleBase(arrays['rule_antecedents'], arrays['rule_consequents']), variables, defuzzifier)
+
+    def save(self, path):
+        """
+        Persists the rule base and sampled MFs as an .npz artifact; load() rebuilds the
+        controller from it without generating MFs or importing skfuzzy.
+        """
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls.from_arrays({name: data[name] for name in data.files})
             
     def update_membership_functions(self, variable_name, new_params):
         """
-        Method to update MFs during optimization. 
-        new_params would be a dictionary of label -> [a, b, c] for trimf.
+        Method to update MFs during optimization or while the controller is in use.
+        new_params is a dictionary of label -> [a, b, c] for trimf, for any input or output
+        variable. Only the rows of labels that actually changed are re-sampled, the engine
+        rebuilds only the state derived from that variable and built skfuzzy terms are
+        updated in place (no ControlSystem rebuild). Concurrent compute / compute_batch
+        calls see either the old or the new MFs, never a mix.
+        Returns the list of labels that were changed.
         """
-        # This requires re-initializing the system usually in skfuzzy or modifying the underlying terms.
-        # For simplicity in this demo, we might just assume fixed MFs for the first pass.
-        pass
+        if variable_name not in self.variables:
+            raise KeyError(f"Unknown variable '{variable_name}'")
+        with self._update_lock:
+            universe, labels, mfs = self.variables[variable_name]
+            new_mfs = np.array(mfs, dtype=float)
+            changed = []
+            for label, abc in new_params.items():
+                if label not in labels:
+                    raise KeyError(f"Unknown label '{label}' for variable '{variable_name}'")
+                k = labels.index(label)
+                row = sample_trimf(universe, abc)
+                if not np.array_equal(row, new_mfs[k]):
+                    new_mfs[k] = row
+                    changed.append(label)
+            if not changed:
+                return changed
+
+            variables = dict(self.variables)
+            variables[variable_name] = (universe, labels, new_mfs)
+            engine = self.engine.with_membership_functions(variable_name, new_mfs)
+            with self._compute_lock:
+                self.variables = variables
+                self.engine = engine
+                if 'simulation' in self.__dict__:
+                    fuzzy_var = self.__dict__[variable_name]
+                    for label in changed:
+                        fuzzy_var[label].mf = new_mfs[labels.index(label)]
+                    # skfuzzy keeps per-input results (and accumulates into them); drop the
+                    # ones from the old MFs. Costs about one compute(), not a rebuild.
+                    self.simulation._reset_simulation()
+        return changed
+
+    def update_rules(self, rows, rules):
+        """
+        Replaces the rules at the given rule_base rows with rules (a RuleBase or rows of
+        labels as in RuleBase.from_table) while the controller is in use. Only those rows
+        of the engine's rule arrays are rewritten. Built skfuzzy objects are rebuilt for the
+        new rules before the swap, so compute() callers keep using the old rules until then
+        instead of waiting for the rebuild. Atomic like update_membership_functions.
+        """
+        if not isinstance(rules, RuleBase):
+            rules = RuleBase.from_table(rules)
+        with self._update_lock:
+            rule_base = self.rule_base.replaced(rows, rules)
+            engine = self.engine.with_rules(np.asarray(rows, dtype=int).reshape(-1), rules.antecedents, rules.consequents)
+            skfuzzy_objects = None
+            if 'simulation' in self.__dict__:
+                with profiling.stage('mamdani.build_skfuzzy'):
+                    skfuzzy_objects = self._build_skfuzzy(rule_base)
+            with self._compute_lock:
+                self.rule_base = rule_base
+                self.engine = engine
+                if skfuzzy_objects is not None:
+                    self.__dict__.update(skfuzzy_objects)
+
+def default_variables():
+    """Default evenly spaced MFs of every variable, as name -> (universe, labels, mf matrix)."""
+    specs = [
+        ('temp', TEMP_RANGE, INPUT_LABELS),
+        ('humidity', HUMIDITY_RANGE, INPUT_LABELS),
+        ('growth_stage', GROWTH_RANGE, INPUT_LABELS),
+        ('heater_fan', TEMP_CONTROL_RANGE, HEATER_FAN_LABELS),
+        ('misting', MISTING_RANGE, MISTING_LABELS)
+    ]
+    variables = {}
+    for name, universe, labels in specs:
+        mfs = generate_membership_functions(universe, labels)
+        variables[name] = (universe, list(labels), np.array([mfs[label] for label in labels]))
+    return variables
@@ -0,0 +1,301 @@
+
+import copy
+import numpy as np
+import profiling
+
+# Defuzzification methods of the native engine:
+# - centroid: centroid of the sampled aggregate (the skfuzzy result)
+# - bisector: point splitting the sampled aggregate's area in half (skfuzzy 'bisector')
+# - mom: mean of maximum of the sampled aggregate (skfuzzy 'mom', without its sampling bias)
+# - analytic_centroid: exact centroid of the clipped triangles in closed form, no sampling
+DEFUZZIFIERS = ('centroid', 'bisector', 'mom', 'analytic_centroid')
+
+class NativeMamdaniEngine:
+    """
+    Exact Mamdani inference in plain NumPy (no ControlSystemSimulation).
+
+    Rules are held as index arrays: one antecedent label index per input (or the
+    "not used" column) and one consequent term index per output. N input triples
+    are evaluated per call as an (N x rules) activation matrix, clipped output sets
+    are aggregated with np.fmax and all centroids are computed in one reduction.
+    defuzzifier selects one of DEFUZZIFIERS.
+    """
+    def __init__(self, inputs, outputs, rule_antecedents, rule_consequents, empty_value=0.0, defuzzifier='centroid'):
+        # inputs / outputs: list of (name, universe, mf matrix (labels, len(universe)))
+        # rule_antecedents: int array (rules, len(inputs)); label index, or num labels for "not used"
+        # rule_consequents: int array (rules, len(outputs)); term index, or -1 for "no effect"
+        self.input_names = [name for name, _, _ in inputs]
+        self.output_names = [name for name, _, _ in outputs]
+        self._inputs = [(np.asarray(u, dtype=float), np.asarray(mfs, dtype=float)) for _, u, mfs in inputs]
+        self._outputs = [(np.asarray(u, dtype=float), np.asarray(mfs, dtype=float)) for _, u, mfs in outputs]
+        self.rule_antecedents = np.asarray(rule_antecedents, dtype=int)
+        self.rule_consequents = np.asarray(rule_consequents, dtype=int)
+        # Crisp value returned when no rule fires for an output
+        self.empty_value = empty_value
+
+        # One-hot (rules, terms) map per output, used to OR (max) rule activations into term activations
+        self._consequent_maps = []
+        for o, (_, mfs) in enumerate(self._outputs):
+            onehot = np.zeros((len(self.rule_consequents), mfs.shape[0]))
+            fired = self.rule_consequents[:, o] >= 0
+            onehot[np.nonzero(fired)[0], self.rule_consequents[fired, o]] = 1.0
+            self._consequent_maps.append(onehot)
+
+        # Rising / falling branch of every output MF as (mu, x) pairs with increasing mu,
+        # used to find where a term crosses its activation level
+        self._branches = [[_branches(u, mf) for mf in mfs] for u, mfs in self._outputs]
+
+        if defuzzifier not in DEFUZZIFIERS:
+            raise ValueError(f"Unknown defuzzifier '{defuzzifier}', expected one of {DEFUZZIFIERS}.")
+        self.defuzzifier = defuzzifier
+        # Peaks of every output's triangles (analytic_centroid only)
+        self._peaks = None
+        if defuzzifier == 'analytic_centroid':
+            self._peaks = [_partition_peaks(u, mfs) for u, mfs in self._outputs]
+
+    @classmethod
+    def from_rule_base(cls, rule_base, inputs, outputs, empty_value=0.0, defuzzifier='centroid'):
+        """
+        Compiles a RuleBase (controllers/rules.py) for the given inputs / outputs, each a list
+        of (name, universe, mf matrix) with MF rows in the rule base's label order.
+        """
+        rule_antecedents = rule_base.antecedents.copy()
+        for i, (_, _, mfs) in enumerate(inputs):
+            rule_antecedents[rule_antecedents[:, i] < 0, i] = len(mfs)
+        return cls(inputs, outputs, rule_antecedents, rule_base.consequents, empty_value=empty_value, defuzzifier=defuzzifier)
+
+    def with_membership_functions(self, name, mfs):
+        """
+        New engine with one variable's MF matrix replaced. Everything else is shared with this
+        engine, and only the state derived from that variable (an output's branches and peaks)
+        is recomputed. Engines are never modified after construction, so callers holding
+        this one keep a consistent snapshot.
+        """
+        engine = copy.copy(self)
+        if name in self.input_names:
+            i = self.input_names.index(name)
+            engine._inputs = list(self._inputs)
+            engine._inputs[i] = (self._inputs[i][0], np.asarray(mfs, dtype=float))
+            return engine
+
+        o = self.output_names.index(name)
+        universe = self._outputs[o][0]
+        mfs = np.asarray(mfs, dtype=float)
+        engine._outputs = list(self._outputs)
+        engine._outputs[o] = (universe, mfs)
+        engine._branches = list(self._branches)
+        engine._branches[o] = [_branches(universe, mf) for mf in mfs]
+        if self._peaks is not None:
+            engine._peaks = list(self._peaks)
+            engine._peaks[o] = _partition_peaks(universe, mfs)
+        return engine
+
+    def with_rules(self, rows, antecedents, consequents):
+        """
+        New engine with the given rule rows replaced (RuleBase layout: label index or -1 per
+        input / output). Only those rows of the rule arrays and consequent maps are rewritten.
+        """
+        rows = np.asarray(rows, dtype=int)
+        antecedents = np.array(antecedents, dtype=int)
+        consequents = np.asarray(consequents, dtype=int)
+        for i, (_, mfs) in enumerate(self._inputs):
+            antecedents[antecedents[:, i] < 0, i] = len(mfs)
+
+        engine = copy.copy(self)
+        engine.rule_antecedents = self.rule_antecedents.copy()
+        engine.rule_antecedents[rows] = antecedents
+        engine.rule_consequents = self.rule_consequents.copy()
+        engine.rule_consequents[rows] = consequents
+        engine._consequent_maps = []
+        for o, onehot in enumerate(self._consequent_maps):
+            onehot = onehot.copy()
+            onehot[rows] = 0.0
+            fired = consequents[:, o] >= 0
+            onehot[rows[fired], consequents[fired, o]] = 1.0
+            engine._consequent_maps.append(onehot)
+        return engine
+
+    def fuzzify(self, values):
+        """
+        Membership degrees per input, each of shape (N, labels + 1); the last column is all ones.
+        Inputs are clipped to their universe, as ControlSystemSimulation does.
+        """
+        mus = []
+        for (universe, mfs), x in zip(self._inputs, values):
+            x = np.clip(x, universe[0], universe[-1])
+            mu = np.ones((x.shape[0], mfs.shape[0] + 1))
+            for j in range(mfs.shape[0]):
+                mu[:, j] = np.interp(x, universe, mfs[j])
+            mus.append(mu)
+        return mus
+
+    def activations(self, mus):
+        """Rule activation matrix (N, rules); AND operator = min."""
+        act = mus[0][:, self.rule_antecedents[:, 0]]
+        for i in range(1, len(mus)):
+            act = np.fmin(act, mus[i][:, self.rule_antecedents[:, i]])
+        return act
+
+    def term_activations(self, act, output_index):
+        """OR operator = max over rules sharing a consequent term -> (N, terms)."""
+        return np.max(act[:, :, None] * self._consequent_maps[output_index][None, :, :], axis=1)
+
+    def cut_universe(self, term_act, output_index):
+        """
+        Output universe upsampled per input row with the points where each term's MF
+        crosses its activation level (as skfuzzy does), shape (N, len(universe) + 2 * terms).
+        Without these points the clipped corners fall between samples and the centroid drifts.
+        """
+        universe, _ = self._outputs[output_index]
+        cuts = [np.tile(universe, (term_act.shape[0], 1))]
+        for k, (rise, fall) in enumerate(self._branches[output_index]):
+            for mu, x in (rise, fall):
+                cuts.append(np.interp(term_act[:, k], mu, x)[:, None])
+        return np.sort(np.concatenate(cuts, axis=1), axis=1)
+
+    def aggregate(self, term_act, x, output_index):
+        """Aggregated output membership at points x (N, P): max over terms of each MF clipped at its activation."""
+        universe, mfs = self._outputs[output_index]
+        agg = np.zeros(x.shape)
+        for k in range(mfs.shape[0]):
+            agg = np.fmax(agg, np.fmin(term_act[:, k:k + 1], np.interp(x, universe, mfs[k])))
+        return agg
+
+    def centroid(self, x, agg):
+        """
+        Batched centroid of piecewise-linear membership functions sampled at x (N, P)
+        (same exact trapezoid areas/moments as skfuzzy's centroid). Empty sets give empty_value.
+        """
+        x1, dx = x[:, :-1], np.diff(x, axis=1)
+        y1, y2 = agg[:, :-1], agg[:, 1:]
+
+        area = 0.5 * dx * (y1 + y2)
+        moment = dx * (0.5 * x1 * (y1 + y2) + dx * (y1 + 2.0 * y2) / 6.0)
+        total_area = area.sum(axis=1)
+        total_moment = moment.sum(axis=1)
+
+        fired = total_area > 0
+        return np.where(fired, total_moment / np.where(fired, total_area, 1.0), self.empty_value)
+
+    def bisector(self, x, agg):
+        """
+        Batched bisector of piecewise-linear membership functions sampled at x (N, P): the
+        point with half of the area on each side, solved exactly inside its segment.
+        """
+        dx = np.diff(x, axis=1)
+        y1, y2 = agg[:, :-1], agg[:, 1:]
+        cumulative = np.cumsum(0.5 * dx * (y1 + y2), axis=1)
+        half = 0.5 * cumulative[:, -1]
+        fired = half > 0
+
+        # Segment holding the bisector and the area still needed inside it
+        rows = np.arange(len(x))
+        seg = np.argmax(cumulative >= half[:, None], axis=1)
+        needed = half - np.where(seg > 0, cumulative[rows, seg - 1], 0.0)
+        x1, w, a, b = x[rows, seg], dx[rows, seg], y1[rows, seg], y2[rows, seg]
+
+        # Area from x1 to x1 + u under a + m * u is a * u + m * u**2 / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (b - a) / w
+            sloped = x1 + (np.sqrt(np.maximum(a * a + 2.0 * slope * needed, 0.0)) - a) / slope
+            flat = x1 + needed / a
+        u = np.where(np.abs(b - a) > 1e-12, sloped, flat)
+        return np.where(fired, u, self.empty_value)
+
+    def mean_of_maximum(self, x, agg):
+        """
+        Batched mean of maximum of piecewise-linear membership functions sampled at x (N, P):
+        the mean position over the plateau segments at the maximum, or over the points at the
+        maximum where it is only reached at isolated points (a triangle tip).
+        """
+        peak = agg.max(axis=1)
+        # Clipped corners can land a rounding error below their activation level
+        at_peak = agg >= peak[:, None] - 1e-9
+        plateau = at_peak[:, :-1] & at_peak[:, 1:]
+        width = np.diff(x, axis=1) * plateau
+        length = width.sum(axis=1)
+        midpoints = 0.5 * (x[:, :-1] + x[:, 1:])
+        plateau_mean = (midpoints * width).sum(axis=1) / np.where(length > 0, length, 1.0)
+        point_mean = (x * at_peak).sum(axis=1) / np.maximum(at_peak.sum(axis=1), 1)
+        mean = np.where(length > 0, plateau_mean, point_mean)
+        return np.where(peak > 0, mean, self.empty_value)
+
+    def analytic_centroid(self, term_act, output_index):
+        """
+        Exact centroid of the aggregate of clipped triangles, without sampling the universe.
+        The output terms partition the universe (_partition_peaks): between two neighbouring
+        peaks only those two terms are nonzero, falling as 1 - t and rising as t
+        (t = position between the peaks in [0, 1]). With activations p and q the aggregate
+        max(min(p, 1 - t), min(q, t)) is linear between the points
+        {0, 1, 1/2, p, 1 - p, q, 1 - q}, so areas and moments over those points are exact.
+        """
+        peaks = self._peaks[output_index]
+        p = term_act[:, :-1, None]
+        q = term_act[:, 1:, None]
+        t = np.concatenate([
+            np.broadcast_to(np.array([0.0, 0.5, 1.0]), p.shape[:2] + (3,)),
+            p, 1.0 - p, q, 1.0 - q
+        ], axis=2)
+        t = np.sort(t, axis=2)
+        agg = np.maximum(np.minimum(p, 1.0 - t), np.minimum(q, t))
+
+        # Segments follow each other along the universe, so flattening keeps x sorted
+        x = peaks[:-1, None] + t * np.diff(peaks)[:, None]
+        n = len(term_act)
+        return self.centroid(x.reshape(n, -1), agg.reshape(n, -1))
+
+    def defuzzify(self, act, output_index):
+        term_act = self.term_activations(act, output_index)
+        if self.defuzzifier == 'analytic_centroid':
+            return self.analytic_centroid(term_act, output_index)
+        x = self.cut_universe(term_act, output_index)
+        agg = self.aggregate(term_act, x, output_index)
+        if self.defuzzifier == 'bisector':
+            return self.bisector(x, agg)
+        if self.defuzzifier == 'mom':
+            return self.mean_of_maximum(x, agg)
+        return self.centroid(x, agg)
+
+    def compute_batch(self, *values):
+        """Evaluates N input tuples (one array per input, in input order) -> dict of output arrays."""
+        values = np.broadcast_arrays(*[np.atleast_1d(np.asarray(v, dtype=float)) for v in values])
+        with profiling.stage('mamdani.fuzzify'):
+            mus = self.fuzzify(values)
+        with profiling.stage('mamdani.rules'):
+            act = self.activations(mus)
+        with profiling.stage('mamdani.defuzzify'):
+            return {
+                name: self.defuzzify(act, o)
+                for o, name in enumerate(self.output_names)
+            }
+
+def _partition_peaks(universe, mfs):
+    """
+    Peak positions of output MFs that are triangles partitioning the universe: the first and
+    last peak at the ends of the universe and every triangle running from the previous peak
+    to the next one (the layout of model/variables.py). Raises ValueError otherwise.
+    """
+    peaks = universe[np.argmax(mfs, axis=1)]
+    partition = np.array([np.interp(universe, peaks, row) for row in np.eye(len(mfs))])
+    if np.any(np.diff(peaks) <= 0) or not np.allclose(mfs, partition, atol=1e-9):
+        raise ValueError("analytic_centroid needs triangular output MFs that partition the universe "
+                         "(each peaking where its neighbours reach zero).")
+    return peaks
+
+def _branches(universe, mf):
+    """
+    Splits a unimodal MF into its rising and falling branch, each returned as (mu, x)
+    with strictly increasing mu so np.interp can invert it.
+    """
+    peak = int(np.argmax(mf))
+    zeros = np.nonzero(mf[:peak + 1] == 0)[0]
+    start = zeros[-1] if len(zeros) else 0
+    zeros = np.nonzero(mf[peak:] == 0)[0]
+    end = peak + (zeros[0] if len(zeros) else len(mf) - 1 - peak)
+
+    rise = (mf[start:peak + 1], universe[start:peak + 1])
+    fall = (mf[peak:end + 1][::-1], universe[peak:end + 1][::-1])
+    for mu, _ in (rise, fall):
+        if np.any(np.diff(mu) <= 0):
+            raise ValueError("Output membership functions must be unimodal (triangular/trapezoidal shoulders).")
+    return rise, fall
@@ -0,0 +1,99 @@
+
+import numpy as np
+from model.plants import CATALOG, PlantCatalog
+from model.variables import TEMP_RANGE, HUMIDITY_RANGE, centers_to_params, sample_trimf
+from controllers.rules import INPUT_LABELS
+from controllers.sugeno import SugenoController
+from controllers.mamdani import MamdaniController
+
+def plant_membership_params(plant):
+    """
+    Input MF breakpoints specialized for a plant: 'Ideal' peaks at the plant's ideal value,
+    'Low'/'High' peak one tolerance below/above it and the shoulders stay at the ends of the
+    universe. Returns variable name -> {label: [a, b, c]} for temp and humidity.
+    """
+    params = {}
+    for name, universe, ideal, tolerance in (
+        ('temp', TEMP_RANGE, plant.ideal_temp, plant.temp_tolerance),
+        ('humidity', HUMIDITY_RANGE, plant.ideal_humidity, plant.humidity_tolerance)
+    ):
+        lo, hi = float(universe.min()), float(universe.max())
+        centers = np.clip([lo, ideal - tolerance, ideal, ideal + tolerance, hi], lo, hi)
+        params[name] = centers_to_params(centers, universe, INPUT_LABELS)
+    return params
+
+def specialize(controller, plant):
+    """New controller of the same kind with its input MFs centered on the plant's ideals."""
+    params = plant_membership_params(plant)
+    if isinstance(controller, SugenoController):
+        specialized = controller.copy()
+        for name, label_params in params.items():
+            specialized.update_membership_functions(name, label_params)
+        return specialized
+    if isinstance(controller, MamdaniController):
+        variables = dict(controller.variables)
+        for name, label_params in params.items():
+            universe, labels, _ = variables[name]
+            variables[name] = (universe, labels, np.array([sample_trimf(universe, label_params[l]) for l in labels]))
+        return MamdaniController(controller.rule_base, variables, controller.defuzzifier)
+    raise TypeError(f"Cannot specialize {type(controller).__name__} per plant")
+
+class PlantProfiles:
+    """
+    Per-plant versions of one base controller, built on first use and kept in a cache keyed
+    by the plant's name and parameters. compute_batch takes a plant index per row into a
+    PlantCatalog (the simulation passes its own catalog with the scenarios' indices; plants,
+    Plants or a PlantCatalog, model.plants.CATALOG by default, is used otherwise) so a
+    mixed-crop greenhouse is evaluated in one call: rows are grouped by plant and each
+    group goes through its profile's compute_batch.
+    """
+    # Tells the simulation to pass each scenario's plant index and its catalog
+    needs_plant = True
+
+    def __init__(self, base, plants=None):
+        self.base = base
+        if plants is None:
+            plants = CATALOG
+        self.plants = plants if isinstance(plants, PlantCatalog) else PlantCatalog.from_plants(plants)
+        self._cache = {}
+
+    @staticmethod
+    def _key(plant):
+        return (plant.name, plant.ideal_temp, plant.ideal_humidity, plant.temp_tolerance, plant.humidity_tolerance)
+
+    def profile(self, plant):
+        """Specialized controller for a Plant (or an index or name in plants)."""
+        if not hasattr(plant, 'ideal_temp'):
+            plant = self.plants.plant(plant)
+        key = self._key(plant)
+        controller = self._cache.get(key)
+        if controller is None:
+            controller = self._cache[key] = specialize(self.base, plant)
+        return controller
+
+    def clear(self):
+        self._cache.clear()
+
+    def compute(self, temp_input, humidity_input, growth_input, plant):
+        return self.profile(plant).compute(temp_input, humidity_input, growth_input)
+
+    def compute_batch(self, temps, hums, growths, plant_idx, catalog=None):
+        """plant_idx indexes catalog (a PlantCatalog), or plants if no catalog is given."""
+        catalog = self.plants if catalog is None else catalog
+        temps, hums, growths, plant_idx = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(temps, dtype=float)),
+            np.atleast_1d(np.asarray(hums, dtype=float)),
+            np.atleast_1d(np.asarray(growths, dtype=float)),
+            np.atleast_1d(np.asarray(plant_idx, dtype=int))
+        )
+        out_hf = np.empty(len(temps))
+        out_mist = np.empty(len(temps))
+        for p in np.unique(plant_idx):
+            rows = np.nonzero(plant_idx == p)[0]
+            res = self.profile(catalog.plant(p)).compute_batch(temps[rows], hums[rows], growths[rows])
+            out_hf[rows] = res['heater_fan']
+            out_mist[rows] = res['misting']
+        return {
+            'heater_fan': out_hf,
+            'misting': out_mist
+        }
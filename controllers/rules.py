@@ -1,8 +1,160 @@
 
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
+import csv
+import json
+from functools import reduce
+import numpy as np
 
-def define_rules(temp, humidity, growth_stage, heater_fan, misting):
+INPUT_VARIABLES = ['temp', 'humidity', 'growth_stage']
+OUTPUT_VARIABLES = ['heater_fan', 'misting']
+
+INPUT_LABELS = ['Very Low', 'Low', 'Ideal', 'High', 'Very High']
+HEATER_FAN_LABELS = ['Cooling_Strong', 'Cooling_Weak', 'Off', 'Heating_Weak', 'Heating_Strong']
+MISTING_LABELS = ['Off', 'Low', 'Medium', 'High', 'Max']
+
+# Single source of truth for the rule base, shared by both controllers.
+# Columns: (temp, humidity, growth_stage, heater_fan, misting); None = input not used.
+RULE_TABLE = [
+    # 1. Extreme Heat & Dryness (Critical for all)
+    ('Very High', 'Very Low', None, 'Cooling_Strong', 'Max'),
+    ('Very High', 'Low', None, 'Cooling_Strong', 'High'),
+    ('High', 'Very Low', None, 'Cooling_Strong', 'High'),
+
+    # 2. Extreme Cold & Wet (Risk of mold/freezing)
+    ('Very Low', 'Very High', None, 'Heating_Strong', 'Off'),
+    ('Very Low', 'High', None, 'Heating_Strong', 'Off'),
+
+    # 3. Ideal Conditions (Maintain)
+    ('Ideal', 'Ideal', None, 'Off', 'Off'),
+
+    # 4. High Temp, Ideal Humidity
+    ('High', 'Ideal', None, 'Cooling_Weak', 'Low'),
+
+    # 5. Low Temp, Ideal Humidity
+    ('Low', 'Ideal', None, 'Heating_Weak', 'Off'),
+
+    # 6. Growth Stage Specifics: Seedling (Very Low Stage) needs stable warmth and humidity
+    ('Low', None, 'Very Low', 'Heating_Weak', 'Off'),
+    ('High', None, 'Very Low', 'Cooling_Weak', 'Low'),
+
+    # 7. Mature Plants (Very High Stage) can tolerate more, but need resource optimization
+    ('High', 'Low', 'Very High', 'Cooling_Weak', 'Medium'),
+
+    # 8. Handling Humidity Specifics
+    ('Ideal', 'Very Low', None, 'Off', 'High'),
+    ('Ideal', 'Low', None, 'Off', 'Medium'),
+    ('Ideal', 'High', None, 'Cooling_Weak', 'Off'), # Fan helps reduce humidity
+    ('Ideal', 'Very High', None, 'Cooling_Strong', 'Off'),
+
+    # 9. Mixed Conditions (Temp & Humidity conflicts)
+    ('High', 'High', None, 'Cooling_Strong', 'Off'), # Hot and Muggy -> Cool hard, no mist
+    ('Low', 'Low', None, 'Heating_Weak', 'Medium'), # Cold and Dry -> Heat, add moisture
+
+    # 10. Rules for 'Very Low' Temp (Freezing risk)
+    ('Very Low', 'Ideal', None, 'Heating_Strong', 'Off'),
+    ('Very Low', 'Low', None, 'Heating_Strong', 'Low'),
+    ('Very Low', 'Very Low', None, 'Heating_Strong', 'Medium'), # Don't mist too much when freezing
+
+    # 11. Rules for 'Very High' Temp with varying humidity
+    ('Very High', 'Ideal', None, 'Cooling_Strong', 'Medium'),
+    ('Very High', 'High', None, 'Cooling_Strong', 'Low'), # Evaporative cooling less effective
+    ('Very High', 'Very High', None, 'Cooling_Strong', 'Off'), # Sauna condition -> Just Fan
+
+    # 12. Transition Rules (Low/High Stage with suboptimal conditions)
+    ('High', 'Low', 'Low', 'Cooling_Weak', 'Medium'),
+    ('Low', 'High', 'High', 'Heating_Weak', 'Off'),
+]
+
+class RuleBase:
+    """
+    Compact rule-base representation: label indices instead of rule objects.
+
+    antecedents: int array (rules, len(INPUT_VARIABLES)), label index into INPUT_LABELS, -1 = input not used
+    consequents: int array (rules, len(OUTPUT_VARIABLES)), label index into the output's labels, -1 = no effect
+    Built once; controllers compile these arrays into their own evaluation form.
+    """
+    def __init__(self, antecedents, consequents):
+        self.antecedents = np.asarray(antecedents, dtype=int).reshape(-1, len(INPUT_VARIABLES))
+        self.consequents = np.asarray(consequents, dtype=int).reshape(-1, len(OUTPUT_VARIABLES))
+        if len(self.antecedents) != len(self.consequents):
+            raise ValueError("Antecedent and consequent arrays must have one row per rule.")
+
+    def __len__(self):
+        return len(self.antecedents)
+
+    @classmethod
+    def from_table(cls, table):
+        """Builds the index arrays from rows of (temp, humidity, growth_stage, heater_fan, misting) labels."""
+        input_labels = [INPUT_LABELS] * len(INPUT_VARIABLES)
+        output_labels = [HEATER_FAN_LABELS, MISTING_LABELS]
+        n_in = len(INPUT_VARIABLES)
+
+        antecedents = np.empty((len(table), n_in), dtype=int)
+        consequents = np.empty((len(table), len(OUTPUT_VARIABLES)), dtype=int)
+        for r, row in enumerate(table):
+            if len(row) != n_in + len(OUTPUT_VARIABLES):
+                raise ValueError(f"Rule {r} should have {n_in + len(OUTPUT_VARIABLES)} columns, got {len(row)}.")
+            antecedents[r] = [_label_index(label, labels) for label, labels in zip(row[:n_in], input_labels)]
+            consequents[r] = [_label_index(label, labels) for label, labels in zip(row[n_in:], output_labels)]
+            if np.all(antecedents[r] < 0):
+                raise ValueError(f"Rule {r} has no antecedent.")
+        return cls(antecedents, consequents)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a rule base from a .json or .csv file.
+        JSON: a list of rows, each either a list in column order or an object keyed by variable name.
+        CSV: a header with the variable names, one rule per line; empty cells mean "not used".
+        """
+        columns = INPUT_VARIABLES + OUTPUT_VARIABLES
+        if str(path).endswith('.json'):
+            with open(path) as f:
+                rows = json.load(f)
+            rows = [[row.get(c) for c in columns] if isinstance(row, dict) else row for row in rows]
+        else:
+            with open(path, newline='') as f:
+                rows = [[row.get(c) or None for c in columns] for row in csv.DictReader(f)]
+        return cls.from_table(rows)
+
+    def replaced(self, rows, rules):
+        """New rule base with the rules at rows replaced by rules (a RuleBase or from_table rows)."""
+        if not isinstance(rules, RuleBase):
+            rules = RuleBase.from_table(rules)
+        rows = np.asarray(rows, dtype=int).reshape(-1)
+        if len(rows) != len(rules):
+            raise ValueError(f"Got {len(rules)} rules for {len(rows)} rows.")
+        antecedents = self.antecedents.copy()
+        consequents = self.consequents.copy()
+        antecedents[rows] = rules.antecedents
+        consequents[rows] = rules.consequents
+        return RuleBase(antecedents, consequents)
+
+    def to_table(self):
+        """Inverse of from_table, rows of labels (None = not used)."""
+        output_labels = [HEATER_FAN_LABELS, MISTING_LABELS]
+        return [
+            tuple(INPUT_LABELS[i] if i >= 0 else None for i in ante) +
+            tuple(labels[i] if i >= 0 else None for i, labels in zip(cons, output_labels))
+            for ante, cons in zip(self.antecedents, self.consequents)
+        ]
+
+    def save(self, path):
+        """Writes the rule base as JSON (object rows keyed by variable name)."""
+        columns = INPUT_VARIABLES + OUTPUT_VARIABLES
+        with open(path, 'w') as f:
+            json.dump([dict(zip(columns, row)) for row in self.to_table()], f, indent=1)
+
+def _label_index(label, labels):
+    if label is None or label == '':
+        return -1
+    if label not in labels:
+        raise ValueError(f"Unknown label '{label}', expected one of {labels}.")
+    return labels.index(label)
+
+# Loaded once at import; both controllers compile from this.
+DEFAULT_RULE_BASE = RuleBase.from_table(RULE_TABLE)
+
+def define_rules(temp, humidity, growth_stage, heater_fan, misting, rule_base=None):
     """
     Defines 25 fuzzy rules based on the 3 inputs and 2 outputs.
     
@@ -18,60 +170,21 @@ def define_rules(temp, humidity, growth_stage, heater_fan, misting):
     Labels: 'Very Low', 'Low', 'Ideal', 'High', 'Very High'
     Output Labels (Heater/Fan): 'Cooling_Strong', 'Cooling_Weak', 'Off', 'Heating_Weak', 'Heating_Strong'
     Output Labels (Misting): 'Off', 'Low', 'Medium', 'High', 'Max'
+
+    The rules come from rule_base (DEFAULT_RULE_BASE, i.e. RULE_TABLE, if not given).
     """
-    
-    # Define mapping for easier rule creation if needed, but we will write them out explicitly to ensure 25.
-    
+    # skfuzzy is only needed here, so importing rules.py stays cheap
+    from skfuzzy import control as ctrl
+
+    rule_base = DEFAULT_RULE_BASE if rule_base is None else rule_base
+    inputs = [temp, humidity, growth_stage]
+    outputs = [heater_fan, misting]
+    output_labels = [HEATER_FAN_LABELS, MISTING_LABELS]
+
     rules = []
-    
-    # 1. Extreme Heat & Dryness (Critical for all)
-    rules.append(ctrl.Rule(temp['Very High'] & humidity['Very Low'], (heater_fan['Cooling_Strong'], misting['Max'])))
-    rules.append(ctrl.Rule(temp['Very High'] & humidity['Low'], (heater_fan['Cooling_Strong'], misting['High'])))
-    rules.append(ctrl.Rule(temp['High'] & humidity['Very Low'], (heater_fan['Cooling_Strong'], misting['High'])))
-    
-    # 2. Extreme Cold & Wet (Risk of mold/freezing)
-    rules.append(ctrl.Rule(temp['Very Low'] & humidity['Very High'], (heater_fan['Heating_Strong'], misting['Off'])))
-    rules.append(ctrl.Rule(temp['Very Low'] & humidity['High'], (heater_fan['Heating_Strong'], misting['Off'])))
-    
-    # 3. Ideal Conditions (Maintain)
-    rules.append(ctrl.Rule(temp['Ideal'] & humidity['Ideal'], (heater_fan['Off'], misting['Off'])))
-    
-    # 4. High Temp, Ideal Humidity
-    rules.append(ctrl.Rule(temp['High'] & humidity['Ideal'], (heater_fan['Cooling_Weak'], misting['Low'])))
-    
-    # 5. Low Temp, Ideal Humidity
-    rules.append(ctrl.Rule(temp['Low'] & humidity['Ideal'], (heater_fan['Heating_Weak'], misting['Off'])))
-    
-    # 6. Growth Stage Specifics: Seedling (Very Low Stage) needs stable warmth and humidity
-    rules.append(ctrl.Rule(growth_stage['Very Low'] & temp['Low'], (heater_fan['Heating_Weak'], misting['Off'])))
-    rules.append(ctrl.Rule(growth_stage['Very Low'] & temp['High'], (heater_fan['Cooling_Weak'], misting['Low'])))
-    
-    # 7. Mature Plants (Very High Stage) can tolerate more, but need resource optimization
-    rules.append(ctrl.Rule(growth_stage['Very High'] & temp['High'] & humidity['Low'], (heater_fan['Cooling_Weak'], misting['Medium'])))
-    
-    # 8. Handling Humidity Specifics
-    rules.append(ctrl.Rule(humidity['Very Low'] & temp['Ideal'], (heater_fan['Off'], misting['High'])))
-    rules.append(ctrl.Rule(humidity['Low'] & temp['Ideal'], (heater_fan['Off'], misting['Medium'])))
-    rules.append(ctrl.Rule(humidity['High'] & temp['Ideal'], (heater_fan['Cooling_Weak'], misting['Off']))) # Fan helps reduce humidity
-    rules.append(ctrl.Rule(humidity['Very High'] & temp['Ideal'], (heater_fan['Cooling_Strong'], misting['Off'])))
-    
-    # 9. Mixed Conditions (Temp & Humidity conflicts)
-    rules.append(ctrl.Rule(temp['High'] & humidity['High'], (heater_fan['Cooling_Strong'], misting['Off']))) # Hot and Muggy -> Cool hard, no mist
-    rules.append(ctrl.Rule(temp['Low'] & humidity['Low'], (heater_fan['Heating_Weak'], misting['Medium']))) # Cold and Dry -> Heat, add moisture
-    
-    # 10. Rules for 'Very Low' Temp (Freezing risk)
-    rules.append(ctrl.Rule(temp['Very Low'] & humidity['Ideal'], (heater_fan['Heating_Strong'], misting['Off'])))
-    rules.append(ctrl.Rule(temp['Very Low'] & humidity['Low'], (heater_fan['Heating_Strong'], misting['Low'])))
-    rules.append(ctrl.Rule(temp['Very Low'] & humidity['Very Low'], (heater_fan['Heating_Strong'], misting['Medium']))) # Don't mist too much when freezing
-    
-    # 11. Rules for 'Very High' Temp with varying humidity
-    rules.append(ctrl.Rule(temp['Very High'] & humidity['Ideal'], (heater_fan['Cooling_Strong'], misting['Medium'])))
-    rules.append(ctrl.Rule(temp['Very High'] & humidity['High'], (heater_fan['Cooling_Strong'], misting['Low']))) # Evaporative cooling less effective
-    rules.append(ctrl.Rule(temp['Very High'] & humidity['Very High'], (heater_fan['Cooling_Strong'], misting['Off']))) # Sauna condition -> Just Fan
-    
-    # 12. Transition Rules (Low/High Stage with suboptimal conditions)
-    rules.append(ctrl.Rule(growth_stage['Low'] & temp['High'] & humidity['Low'], (heater_fan['Cooling_Weak'], misting['Medium'])))
-    rules.append(ctrl.Rule(growth_stage['High'] & temp['Low'] & humidity['High'], (heater_fan['Heating_Weak'], misting['Off'])))
-    
-    return rules
+    for ante, cons in zip(rule_base.antecedents, rule_base.consequents):
+        terms = [var[INPUT_LABELS[i]] for var, i in zip(inputs, ante) if i >= 0]
+        consequent = [var[labels[i]] for var, labels, i in zip(outputs, output_labels, cons) if i >= 0]
+        rules.append(ctrl.Rule(reduce(lambda a, b: a & b, terms), tuple(consequent)))
 
+    return rules
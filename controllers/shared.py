@@ -0,0 +1,136 @@
+import json
+import mmap
+import struct
+from multiprocessing import shared_memory
+import numpy as np
+from controllers.mamdani import MamdaniController
+from controllers.sugeno import SugenoController
+from controllers.compiled import CompiledMamdaniController
+
+# Controllers that can be published: class name -> class with to_arrays() / from_arrays()
+SHAREABLE = {cls.__name__: cls for cls in (MamdaniController, SugenoController, CompiledMamdaniController)}
+
+# Block layout: 8-byte header length, JSON header (controller kind and per-array
+# name / dtype / shape / offset), then every array at a 64-byte aligned offset
+_LENGTH = struct.Struct('<Q')
+ALIGNMENT = 64
+
+# Controllers attached in this process, (kind, name, path) -> (block, controller), so
+# handles unpickled with every task attach only once
+_attached = {}
+
+class SharedController:
+    """
+    Handle to a controller's tables published once by publish(), in a shared memory
+    block (name) or a file (path). Pickles as that reference only, so it can go to pool
+    workers as an initializer argument or with every task; attach() rebuilds the controller
+    on read-only views of the published arrays without copying them.
+    """
+    def __init__(self, kind, name=None, path=None):
+        self.kind = kind
+        self.name = name
+        self.path = path
+        self._block = None
+        self._owner = False
+
+    def __getstate__(self):
+        return {'kind': self.kind, 'name': self.name, 'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.unlink()
+
+    @property
+    def key(self):
+        return (self.kind, self.name, self.path)
+
+    def attach(self):
+        """Controller on the published tables, attached once per process."""
+        entry = _attached.get(self.key)
+        if entry is None:
+            block = self._block
+            if block is None and self.path is not None:
+                with open(self.path, 'rb') as f:
+                    block = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            elif block is None:
+                block = shared_memory.SharedMemory(self.name)
+            entry = _attached[self.key] = (block, SHAREABLE[self.kind].from_arrays(_views(_buffer(block))))
+        return entry[1]
+
+    def unlink(self):
+        """Frees the shared memory block (publisher only; file blocks are left to the caller)."""
+        _attached.pop(self.key, None)
+        if self._owner:
+            self._block.unlink()
+            self._owner = False
+
+def shareable(controller):
+    return type(controller).__name__ in SHAREABLE
+
+def publish(controller, path=None):
+    """
+    Publishes a controller's tables (its to_arrays()) once: into a new shared memory
+    block, or into the file at path (attached with mmap) if given. Returns the
+    SharedController handle; the publisher should unlink() a shared memory block when
+    no worker needs it anymore (or use the handle as a context manager).
+    """
+    kind = type(controller).__name__
+    if kind not in SHAREABLE:
+        raise TypeError(f"Cannot publish {kind}; shareable controllers: {list(SHAREABLE)}")
+
+    arrays = {name: np.require(a, requirements='C') for name, a in controller.to_arrays().items()}
+    entries = []
+    offset = 0
+    for name, a in arrays.items():
+        entries.append({'name': name, 'dtype': a.dtype.str, 'shape': list(a.shape), 'offset': offset})
+        offset = _aligned(offset + a.nbytes)
+    header = json.dumps({'kind': kind, 'arrays': entries}).encode()
+    data_start = _aligned(_LENGTH.size + len(header))
+    size = max(data_start + offset, 1)
+
+    if path is None:
+        block = shared_memory.SharedMemory(create=True, size=size)
+        handle = SharedController(kind, name=block.name)
+        handle._owner = True
+    else:
+        with open(path, 'w+b') as f:
+            f.truncate(size)
+            block = mmap.mmap(f.fileno(), size)
+        handle = SharedController(kind, path=path)
+
+    buf = _buffer(block)
+    _LENGTH.pack_into(buf, 0, len(header))
+    buf[_LENGTH.size:_LENGTH.size + len(header)] = header
+    for entry, a in zip(entries, arrays.values()):
+        start = data_start + entry['offset']
+        buf[start:start + a.nbytes] = a.reshape(-1).view(np.uint8)
+    del buf
+    if path is not None:
+        block.flush()
+        block.close()
+    else:
+        handle._block = block
+    return handle
+
+def _aligned(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _buffer(block):
+    return block.buf if isinstance(block, shared_memory.SharedMemory) else memoryview(block)
+
+def _views(buf):
+    """name -> read-only array view into a published block."""
+    (length,) = _LENGTH.unpack_from(buf, 0)
+    header = json.loads(bytes(buf[_LENGTH.size:_LENGTH.size + length]))
+    data_start = _aligned(_LENGTH.size + length)
+    arrays = {}
+    for entry in header['arrays']:
+        a = np.ndarray(tuple(entry['shape']), dtype=np.dtype(entry['dtype']), buffer=buf, offset=data_start + entry['offset'])
+        a.flags.writeable = False
+        arrays[entry['name']] = a
+    return arrays
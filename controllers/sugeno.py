@@ -1,14 +1,27 @@
 
 import numpy as np
-import skfuzzy as fuzz
-from model.variables import TEMP_RANGE, HUMIDITY_RANGE, GROWTH_RANGE, generate_membership_functions
+import copy
+import threading
+import profiling
+from model.variables import TEMP_RANGE, HUMIDITY_RANGE, GROWTH_RANGE, generate_membership_params
+from model.membership import TriangularMFSet, line_form, evaluate_lines
+from controllers.rules import DEFAULT_RULE_BASE, RuleBase, INPUT_VARIABLES, INPUT_LABELS, HEATER_FAN_LABELS, MISTING_LABELS
+
+# Firing every rule for every row is a few array operations; the sparse per-cell path has a
+# fixed cost per occupied cell combination and only pays off once each combination holds
+# about this many (rows x rules) on average, e.g. 240 rows for the 25 default rules or
+# 28 rows for a full 216-rule base
+SPARSE_MIN_GROUP_WORK = 6000
 
 class SugenoController:
-    def __init__(self):
-        # We need the same MFs for inputs to calculate firing strength
-        self.temp_mfs = generate_membership_functions(TEMP_RANGE)
-        self.humidity_mfs = generate_membership_functions(HUMIDITY_RANGE)
-        self.growth_mfs = generate_membership_functions(GROWTH_RANGE)
+    def __init__(self, rule_base=None):
+        # We need the same MFs for inputs to calculate firing strength.
+        # Only the triangle breakpoints are kept; membership is evaluated in closed form.
+        mf_sets = {
+            'temp': TriangularMFSet.from_dict(generate_membership_params(TEMP_RANGE)),
+            'humidity': TriangularMFSet.from_dict(generate_membership_params(HUMIDITY_RANGE)),
+            'growth_stage': TriangularMFSet.from_dict(generate_membership_params(GROWTH_RANGE))
+        }
         
         # Singleton Constants for Sugeno Outputs (0th order)
         # Heater/Fan
@@ -29,105 +42,317 @@ class SugenoController:
             'Max': 100
         }
 
-    def _get_membership(self, value, mfs):
-        """Calculates membership degree for a specific value against all MFs."""
-        memberships = {}
-        for label, mf in mfs.items():
-            memberships[label] = fuzz.interp_membership(np.arange(0, len(mf)), mf, value) 
-            # Note: The fuzz.interp_membership expects the x-range of the MF. 
-            # Our calculate_membership logic needs the original x range used to create the MF.
-            # We implemented generate_membership_functions using specific ranges.
-            # Let's direct access:
-            
-        return memberships
-        
+        # Declarative rule table shared with the Mamdani controller (see controllers/rules.py),
+        # compiled with the MF sets into the state compute_batch reads.
+        # Hot reload (update_membership_functions / update_rules): the state is never modified
+        # once built, updates are serialized by _update_lock and publish a new state by
+        # attribute assignment, so compute_batch needs no lock.
+        self._state = _InferenceState(mf_sets, DEFAULT_RULE_BASE if rule_base is None else rule_base,
+                                      self.output_hf, self.output_mist)
+        self._update_lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks cannot be pickled
+        return {key: value for key, value in self.__dict__.items() if key != '_update_lock'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._update_lock = threading.Lock()
+
+    @property
+    def mf_sets(self):
+        """Input variable name -> TriangularMFSet (replace sets through update_membership_functions)."""
+        return self._state.mf_sets
+
+    @property
+    def rule_base(self):
+        return self._state.rule_base
+
+    @property
+    def mf_params(self):
+        """variable name -> {label: [a, b, c]}"""
+        return {name: mf_set.to_dict() for name, mf_set in self.mf_sets.items()}
+
+    # Sampled MFs over the universes, e.g. for plotting (not used for inference)
+    @property
+    def temp_mfs(self):
+        return self.mf_sets['temp'].sample(TEMP_RANGE)
+
+    @property
+    def humidity_mfs(self):
+        return self.mf_sets['humidity'].sample(HUMIDITY_RANGE)
+
+    @property
+    def growth_mfs(self):
+        return self.mf_sets['growth_stage'].sample(GROWTH_RANGE)
+
+    def update_membership_functions(self, variable_name, new_params):
+        """
+        Method to update MFs during optimization or while the controller is in use.
+        new_params is a dictionary of label -> [a, b, c] for trimf. Only the breakpoint
+        rows of labels that actually changed are replaced. Concurrent compute_batch calls
+        see either the old or the new MFs, never a mix.
+        Returns the list of labels that were changed.
+        """
+        with self._update_lock:
+            state = self._state
+            if variable_name not in state.mf_sets:
+                raise KeyError(f"Unknown input variable '{variable_name}'")
+            mf_set, changed = state.mf_sets[variable_name].updated(new_params)
+            if changed:
+                mf_sets = dict(state.mf_sets)
+                mf_sets[variable_name] = mf_set
+                self._state = state.with_mf_sets(mf_sets)
+        return changed
+
+    def update_rules(self, rows, rules):
+        """
+        Replaces the rules at the given rule_base rows with rules (a RuleBase or rows of
+        labels as in RuleBase.from_table) while the controller is in use. Atomic like
+        update_membership_functions.
+        """
+        if not isinstance(rules, RuleBase):
+            rules = RuleBase.from_table(rules)
+        with self._update_lock:
+            state = self._state
+            self._state = _InferenceState(state.mf_sets, state.rule_base.replaced(rows, rules),
+                                          self.output_hf, self.output_mist)
+
+    def copy(self):
+        """
+        Independent controller sharing the compiled state until either one is updated
+        (updates replace the state instead of mutating it).
+        """
+        clone = copy.copy(self)
+        clone._update_lock = threading.Lock()
+        return clone
+
+    def to_arrays(self):
+        """Rule base, MF breakpoints and output constants as name -> array (the save() layout)."""
+        arrays = {
+            'rule_antecedents': self.rule_base.antecedents,
+            'rule_consequents': self.rule_base.consequents,
+            'output_hf': np.array([self.output_hf[l] for l in HEATER_FAN_LABELS], dtype=float),
+            'output_mist': np.array([self.output_mist[l] for l in MISTING_LABELS], dtype=float)
+        }
+        for name, mf_set in self.mf_sets.items():
+            arrays[f'{name}_labels'] = np.array(mf_set.labels)
+            arrays[f'{name}_params'] = mf_set.params
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        controller = cls()
+        mf_sets = {
+            name: TriangularMFSet([str(l) for l in arrays[f'{name}_labels']], arrays[f'{name}_params'])
+            for name in INPUT_VARIABLES
+        }
+        controller.output_hf = dict(zip(HEATER_FAN_LABELS, arrays['output_hf'].tolist()))
+        controller.output_mist = dict(zip(MISTING_LABELS, arrays['output_mist'].tolist()))
+        # Output constants are baked into the compiled rule arrays
+        controller._state = _InferenceState(mf_sets, RuleBase(arrays['rule_antecedents'], arrays['rule_consequents']),
+                                            controller.output_hf, controller.output_mist)
+        return controller
+
+    def save(self, path):
+        """Persists the rule base, MF breakpoints and output constants as an .npz artifact."""
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls.from_arrays({name: data[name] for name in data.files})
+
     def compute(self, temp, humidity, growth):
         """
-        Manually evaluates the 25 rules.
+        Evaluates the 25 rules for a single (temp, humidity, growth) triple.
+        Thin wrapper over compute_batch.
         """
-        
-        # 1. Fuzzification
-        # We need to pass the correct ranges.
-        t_mu = {l: fuzz.interp_membership(TEMP_RANGE, mf, temp) for l, mf in self.temp_mfs.items()}
-        h_mu = {l: fuzz.interp_membership(HUMIDITY_RANGE, mf, humidity) for l, mf in self.humidity_mfs.items()}
-        g_mu = {l: fuzz.interp_membership(GROWTH_RANGE, mf, growth) for l, mf in self.growth_mfs.items()}
-        
-        rules = []
-        
-        # Helper to add rule (Antecedent strength, HF Output Constant, Mist Output Constant)
-        def add_rule(strength, hf_label, mist_label):
-            rules.append((strength, self.output_hf[hf_label], self.output_mist[mist_label]))
+        out = self.compute_batch(temp, humidity, growth)
+        return {
+            'heater_fan': out['heater_fan'][0],
+            'misting': out['misting'][0]
+        }
+
+    def _fuzzify_batch(self, state, temps, hums, growths, params=None):
+        """
+        Membership degrees of every input against every label in one closed-form evaluation,
+        shape (N, inputs * labels + 1). The extra last column is all ones and stands for
+        "input not used by this rule".
+        """
+        x = np.stack([temps, hums, growths], axis=1)[:, state.label_input]
+        lines = state.lines() if params is None else line_form(params)
+        mu = np.ones((x.shape[0], x.shape[1] + 1))
+        mu[:, :-1] = evaluate_lines(x, lines)
+        return mu
+
+    def compute_batch(self, temps, hums, growths, params=None):
+        """
+        Evaluates the 25 rules for N input triples at once.
+        Accepts scalars or arrays of any (broadcastable) length and returns
+        'heater_fan' / 'misting' arrays of length N. Large batches with many rows per input
+        cell only fire the rules that can fire in each cell (see SPARSE_MIN_GROUP_WORK).
+
+        params: optional (N, inputs * labels, 3) breakpoints giving every row its own MFs
+        (labels stacked in INPUT_VARIABLES order, as in mf_sets), e.g. to evaluate a whole
+        optimizer population in one call. The MF sets are then ignored and every rule is
+        evaluated.
+        """
+        temps, hums, growths = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(temps, dtype=float)),
+            np.atleast_1d(np.asarray(hums, dtype=float)),
+            np.atleast_1d(np.asarray(growths, dtype=float))
+        )
+
+        # Read once, so a concurrent update never shows up halfway through a call
+        state = self._state
+
+        # 1. Fuzzification -> (N, inputs * labels + 1)
+        with profiling.stage('sugeno.fuzzify'):
+            mu = self._fuzzify_batch(state, temps, hums, growths, params)
+
+        # Per-row MFs have no shared firing index; small batches are cheaper to fire whole
+        max_groups = len(temps) * len(state.rule_base) // SPARSE_MIN_GROUP_WORK
+        if params is not None or max_groups == 0:
+            return state.fire_all_rules(mu)
+
+        # 2. Rule firing (AND operator = min), grouped by the cell each input falls in so
+        # only the rules that can fire for that group are evaluated
+        with profiling.stage('sugeno.rules'):
+            index = state.firing_index()
+            cells = [np.searchsorted(edges, x, side='right') for (edges, _), x in zip(index, (temps, hums, growths))]
+            groups = _group_rows(cells, [len(edges) + 1 for edges, _ in index], max_groups)
+        if groups is None:
+            # Rows spread over too many cells for the per-group overhead to pay off
+            return state.fire_all_rules(mu)
+
+        out_hf = np.empty(len(temps))
+        out_mist = np.empty(len(temps))
+        for key, rows in groups:
+            rules = state.candidate_rules(key)
+            with profiling.stage('sugeno.rules'):
+                m = mu[rows]
+                strength = np.minimum(np.minimum(m[:, state.rule_temp[rules]], m[:, state.rule_hum[rules]]), m[:, state.rule_growth[rules]])
+
+            # 3. Defuzzification (Weighted Average)
+            with profiling.stage('sugeno.defuzzify'):
+                out_hf[rows] = _weighted_average(strength, state.rule_hf[rules], state.mask_hf[rules])
+                out_mist[rows] = _weighted_average(strength, state.rule_mist[rules], state.mask_mist[rules])
 
-        # Re-implementing the 25 rules logic from rules.py but for manual calculation
-        # AND operator = np.fmin (or min)
-        
-        # 1. Extreme Heat & Dryness
-        add_rule(min(t_mu['Very High'], h_mu['Very Low']), 'Cooling_Strong', 'Max')
-        add_rule(min(t_mu['Very High'], h_mu['Low']), 'Cooling_Strong', 'High')
-        add_rule(min(t_mu['High'], h_mu['Very Low']), 'Cooling_Strong', 'High')
-        
-        # 2. Extreme Cold & Wet
-        add_rule(min(t_mu['Very Low'], h_mu['Very High']), 'Heating_Strong', 'Off')
-        add_rule(min(t_mu['Very Low'], h_mu['High']), 'Heating_Strong', 'Off')
-        
-        # 3. Ideal
-        add_rule(min(t_mu['Ideal'], h_mu['Ideal']), 'Off', 'Off')
-        
-        # 4. High Temp, Ideal Humidity
-        add_rule(min(t_mu['High'], h_mu['Ideal']), 'Cooling_Weak', 'Low')
-        
-        # 5. Low Temp, Ideal Humidity
-        add_rule(min(t_mu['Low'], h_mu['Ideal']), 'Heating_Weak', 'Off')
-        
-        # 6. Growth Stage Specifics
-        add_rule(min(g_mu['Very Low'], t_mu['Low']), 'Heating_Weak', 'Off')
-        add_rule(min(g_mu['Very Low'], t_mu['High']), 'Cooling_Weak', 'Low')
-        
-        # 7. Mature Plants
-        add_rule(min(g_mu['Very High'], t_mu['High'], h_mu['Low']), 'Cooling_Weak', 'Medium')
-        
-        # 8. Handling Humidity Specifics
-        add_rule(min(h_mu['Very Low'], t_mu['Ideal']), 'Off', 'High')
-        add_rule(min(h_mu['Low'], t_mu['Ideal']), 'Off', 'Medium')
-        add_rule(min(h_mu['High'], t_mu['Ideal']), 'Cooling_Weak', 'Off')
-        add_rule(min(h_mu['Very High'], t_mu['Ideal']), 'Cooling_Strong', 'Off')
-        
-        # 9. Mixed
-        add_rule(min(t_mu['High'], h_mu['High']), 'Cooling_Strong', 'Off')
-        add_rule(min(t_mu['Low'], h_mu['Low']), 'Heating_Weak', 'Medium')
-        
-        # 10. 'Very Low' Temp
-        add_rule(min(t_mu['Very Low'], h_mu['Ideal']), 'Heating_Strong', 'Off')
-        add_rule(min(t_mu['Very Low'], h_mu['Low']), 'Heating_Strong', 'Low')
-        add_rule(min(t_mu['Very Low'], h_mu['Very Low']), 'Heating_Strong', 'Medium')
-        
-        # 11. 'Very High' Temp
-        add_rule(min(t_mu['Very High'], h_mu['Ideal']), 'Cooling_Strong', 'Medium')
-        add_rule(min(t_mu['Very High'], h_mu['High']), 'Cooling_Strong', 'Low')
-        add_rule(min(t_mu['Very High'], h_mu['Very High']), 'Cooling_Strong', 'Off')
-        
-        # 12. Transitions
-        add_rule(min(g_mu['Low'], t_mu['High'], h_mu['Low']), 'Cooling_Weak', 'Medium')
-        add_rule(min(g_mu['High'], t_mu['Low'], h_mu['High']), 'Heating_Weak', 'Off')
-
-        # Defuzzification (Weighted Average)
-        numerator_hf = 0
-        denominator_hf = 0
-        numerator_mist = 0
-        denominator_mist = 0
-        
-        for strength, hf_val, mist_val in rules:
-            numerator_hf += strength * hf_val
-            denominator_hf += strength
-            
-            numerator_mist += strength * mist_val
-            denominator_mist += strength
-            
-        # Avoid division by zero
-        out_hf = numerator_hf / denominator_hf if denominator_hf > 0 else 0
-        out_mist = numerator_mist / denominator_mist if denominator_mist > 0 else 0
-        
         return {
             'heater_fan': out_hf,
             'misting': out_mist
         }
+
+class _InferenceState:
+    """
+    Everything compute_batch reads, derived from one set of MFs and one rule base: the
+    compiled rule arrays, the stacked MF lines and the rule-firing index. Never modified
+    once built (the lazily built tables are only filled in), so controllers and their
+    copies share it and updates replace it as a whole.
+    """
+    def __init__(self, mf_sets, rule_base, output_hf, output_mist):
+        self.mf_sets = mf_sets
+        self.rule_base = rule_base
+        self._compile_rules(rule_base, output_hf, output_mist)
+        # Rise/fall lines of all input labels stacked in INPUT_VARIABLES order, built on first use
+        self._lines = None
+        # Rule-firing index, built on first use
+        self._firing_index = None
+        self._candidates = {}
+
+    def _compile_rules(self, rule_base, output_hf, output_mist):
+        """
+        Turns the rule base into index arrays so all rules fire in one array operation.
+        "Not used" inputs point at the always-one column added during fuzzification;
+        rules with no effect on an output get a zero weight mask for that output.
+        """
+        # Column of each (input, label) in the stacked membership table: temp labels,
+        # then humidity labels, then growth labels, then the always-one column
+        offsets = np.arange(len(INPUT_VARIABLES)) * len(INPUT_LABELS)
+        not_used = len(INPUT_VARIABLES) * len(INPUT_LABELS)
+        ante = np.where(rule_base.antecedents < 0, not_used, rule_base.antecedents + offsets)
+        self.rule_temp = ante[:, 0]
+        self.rule_hum = ante[:, 1]
+        self.rule_growth = ante[:, 2]
+        # Input feeding each stacked label column
+        self.label_input = np.repeat(np.arange(len(INPUT_VARIABLES)), len(INPUT_LABELS))
+
+        hf_consts = np.array([output_hf[l] for l in HEATER_FAN_LABELS], dtype=float)
+        mist_consts = np.array([output_mist[l] for l in MISTING_LABELS], dtype=float)
+        hf_idx, mist_idx = rule_base.consequents[:, 0], rule_base.consequents[:, 1]
+        self.rule_hf = hf_consts[hf_idx] * (hf_idx >= 0)
+        self.rule_mist = mist_consts[mist_idx] * (mist_idx >= 0)
+        self.mask_hf = (hf_idx >= 0).astype(float)
+        self.mask_mist = (mist_idx >= 0).astype(float)
+
+    def with_mf_sets(self, mf_sets):
+        """New state for other MF sets, sharing the compiled rule arrays."""
+        state = copy.copy(self)
+        state.mf_sets = mf_sets
+        state._lines = None
+        state._firing_index = None
+        state._candidates = {}
+        return state
+
+    def lines(self):
+        if self._lines is None:
+            self._lines = line_form(np.concatenate([self.mf_sets[name].params for name in INPUT_VARIABLES]))
+        return self._lines
+
+    def firing_index(self):
+        """
+        Per input, the cell edges of its MF set and a (cells, rules) table of the rules that
+        can fire for inputs in each cell (a rule that does not use the input can fire in
+        every cell). Rule subsets for cell combinations are cached in _candidates as they
+        are met.
+        """
+        if self._firing_index is None:
+            index = []
+            for i, name in enumerate(INPUT_VARIABLES):
+                edges, active = self.mf_sets[name].active_cells()
+                ante = self.rule_base.antecedents[:, i]
+                can_fire = (ante < 0) | active[:, np.maximum(ante, 0)]
+                index.append((edges, can_fire))
+            self._firing_index = index
+        return self._firing_index
+
+    def candidate_rules(self, cells):
+        """Indices of the rules that can fire for one combination of input cells."""
+        rules = self._candidates.get(cells)
+        if rules is None:
+            can_fire = np.logical_and.reduce([table[c] for (_, table), c in zip(self.firing_index(), cells)])
+            rules = self._candidates[cells] = np.nonzero(can_fire)[0]
+        return rules
+
+    def fire_all_rules(self, mu):
+        """Rule firing and defuzzification over every rule for all rows (no firing index)."""
+        with profiling.stage('sugeno.rules'):
+            strength = np.minimum(np.minimum(mu[:, self.rule_temp], mu[:, self.rule_hum]), mu[:, self.rule_growth])
+        with profiling.stage('sugeno.defuzzify'):
+            return {
+                'heater_fan': _weighted_average(strength, self.rule_hf, self.mask_hf),
+                'misting': _weighted_average(strength, self.rule_mist, self.mask_mist)
+            }
+
+def _group_rows(cells, dims, max_groups):
+    """
+    Groups rows by their combination of input cells -> list of (cells tuple, row indices),
+    or None if the rows fall in more than max_groups cell combinations.
+    """
+    keys = np.ravel_multi_index(cells, dims)
+    order = np.argsort(keys, kind='stable')
+    uniq, starts = np.unique(keys[order], return_index=True)
+    if len(uniq) > max_groups:
+        return None
+    bounds = np.append(starts, len(keys))
+    return [
+        (tuple(int(c) for c in np.unravel_index(key, dims)), order[bounds[g]:bounds[g + 1]])
+        for g, key in enumerate(uniq)
+    ]
+
+def _weighted_average(strength, consts, mask):
+    numerator = strength @ consts
+    denominator = strength @ mask
+    # Avoid division by zero
+    return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1.0), 0.0)
@@ -2,7 +2,8 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import time
+import threading
+from collections import OrderedDict
 
 # Import our system modules
 # We need to ensure the path is correct or just import as is if in the same dir
@@ -13,6 +14,34 @@ from model.plants import ALL_PLANTS
 
 st.set_page_config(page_title="Smart Greenhouse", layout="wide", initial_sidebar_state="expanded")
 
+# Number of simulation results kept for repeated (num_tests, steps_per_test, seed) requests
+RESULT_CACHE_SIZE = 16
+
+@st.cache_resource
+def load_controllers():
+    """Built once per server process and shared by every rerun and session."""
+    return MamdaniController(), SugenoController()
+
+@st.cache_resource
+def result_cache():
+    """
+    (num_tests, steps_per_test, seed) -> metrics, least recently used first, and the lock
+    guarding it: every session thread of the server shares the cache.
+    """
+    return OrderedDict(), threading.Lock()
+
+def metrics_table(metrics):
+    # One column per controller in the simulation's registry
+    table = {"Metric": ["Average Response Time (ms)", "Average Error", "Energy Usage", "Smoothness Score"]}
+    for name, m in metrics.items():
+        table[name] = [
+            m['avg_response'] * 1000,
+            m['avg_error'],
+            m['avg_energy'],
+            m['avg_smoothness']
+        ]
+    return pd.DataFrame(table)
+
 # --- APPLE-STYLE CSS INJECTION ---
 st.markdown("""
 <style>
@@ -135,48 +164,50 @@ st.sidebar.markdown("## Control Center")
 st.sidebar.markdown("Configure your simulation parameters.")
 num_tests = st.sidebar.slider("Number of Random Tests", min_value=1, max_value=50, value=20)
 steps_per_test = st.sidebar.slider("Steps per Test", min_value=10, max_value=100, value=50)
+seed = int(st.sidebar.number_input("Random Seed", min_value=0, value=0, step=1))
 
 st.sidebar.markdown("---")
 
 if st.sidebar.button("Run Simulation", use_container_width=True):
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    with st.spinner("Processing Logic..."):
-        mamdani = MamdaniController()
-        sugeno = SugenoController()
-        sim = GreenhouseSimulation(mamdani, sugeno)
-        progress_bar.progress(30)
-        time.sleep(0.3)
-    
-    with st.spinner("Running stochastic cycles..."):
-        metrics = sim.run_random_tests(num_tests=num_tests, steps_per_test=steps_per_test)
-        progress_bar.progress(100)
-        time.sleep(0.5)
+    cache, cache_lock = result_cache()
+    key = (num_tests, steps_per_test, seed)
+
+    with cache_lock:
+        metrics = cache.get(key)
+        if metrics is not None:
+            cache.move_to_end(key)
+
+    if metrics is None:
+        with st.spinner("Processing Logic..."):
+            mamdani, sugeno = load_controllers()
+            sim = GreenhouseSimulation(mamdani, sugeno)
+
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+        partial_table = st.empty()
+
+        # Real progress: one update per finished test, with the metrics so far
+        for completed, metrics in sim.iter_random_tests(num_tests=num_tests, steps_per_test=steps_per_test, seed=seed):
+            progress_bar.progress(completed / num_tests)
+            status_text.markdown(f"Running stochastic cycles... {completed}/{num_tests} tests")
+            partial_table.dataframe(metrics_table(metrics), use_container_width=True, hide_index=True)
+
         status_text.empty()
         progress_bar.empty()
+        partial_table.empty()
+
+        # The simulation itself runs unlocked; sessions only wait for each other here
+        with cache_lock:
+            cache[key] = metrics
+            while len(cache) > RESULT_CACHE_SIZE:
+                cache.popitem(last=False)
         
     st.markdown("<div style='text-align: center; color: #34C759; font-weight: 600; margin-bottom: 20px;'>Simulation Successfully Completed</div>", unsafe_allow_html=True)
     
     # 1. Comparison Table
     st.markdown("## Performance Metrics")
     
-    data = {
-        "Metric": ["Average Response Time (ms)", "Average Error", "Energy Usage", "Smoothness Score"],
-        "Mamdani": [
-            metrics['Mamdani']['avg_response'] * 1000,
-            metrics['Mamdani']['avg_error'],
-            metrics['Mamdani']['avg_energy'],
-            metrics['Mamdani']['avg_smoothness']
-        ],
-        "Sugeno": [
-            metrics['Sugeno']['avg_response'] * 1000,
-            metrics['Sugeno']['avg_error'],
-            metrics['Sugeno']['avg_energy'],
-            metrics['Sugeno']['avg_smoothness']
-        ]
-    }
-    df = pd.DataFrame(data)
+    df = metrics_table(metrics)
     
     # Render Table in Card
     st.markdown('<div class="apple-card">', unsafe_allow_html=True)
@@ -3,7 +3,7 @@ import sys
 from controllers.mamdani import MamdaniController
 from controllers.sugeno import SugenoController
 from simulation import GreenhouseSimulation
-from optimization.optimizer import GeneticOptimizer
+from optimization.optimizer import GeneticOptimizer, apply_gene
 
 def main():
     print("Initializing Smart Greenhouse Control System...")
@@ -19,10 +19,11 @@ def main():
     # Creates a simulation runner for the optimizer
     sim_for_opt = GreenhouseSimulation(mamdani, sugeno)
     optimizer = GeneticOptimizer(sim_for_opt, population_size=5, generations=3) # Small for speed in demo
-    best_factor = optimizer.run()
+    best_gene = optimizer.run()
     
-    # Apply optimization results (Conceptual step for this demo)
-    print(f"Optimization finished. Optimized Factor: {best_factor}")
+    # Apply optimization results (reshapes the Sugeno input MFs)
+    apply_gene(sugeno, best_gene)
+    print(f"Optimization finished. Optimized MF centers: {best_gene}")
     
     # 3. Final Performance Comparison
     print("\nRunning Final Performance Comparison (20 Random Tests)...")
@@ -0,0 +1,95 @@
+
+import numpy as np
+
+class TriangularMFSet:
+    """
+    Compact set of triangular MFs for one variable: only the [a, b, c] breakpoints per
+    label are stored, in a small (labels, 3) float array. Membership is evaluated in closed
+    form, so there is no universe array and no resolution limit.
+    """
+    def __init__(self, labels, params):
+        self.labels = list(labels)
+        self.params = np.array(params, dtype=float).reshape(len(self.labels), 3)
+        # Per-label rise/fall lines, computed on first use
+        self._lines = None
+
+    @classmethod
+    def from_dict(cls, params):
+        """From a label -> [a, b, c] dictionary (e.g. generate_membership_params)."""
+        return cls(list(params.keys()), list(params.values()))
+
+    def to_dict(self):
+        return {label: list(abc) for label, abc in zip(self.labels, self.params)}
+
+    def evaluate(self, x):
+        """Membership degrees of x (scalar or (N,) array) -> (N, labels)."""
+        if self._lines is None:
+            self._lines = line_form(self.params)
+        return evaluate_lines(np.atleast_1d(np.asarray(x, dtype=float))[:, None], self._lines)
+
+    def sample(self, universe):
+        """Sampled label -> MF array dictionary over a universe, e.g. for plotting or skfuzzy."""
+        mu = self.evaluate(universe)
+        return {label: mu[:, j] for j, label in enumerate(self.labels)}
+
+    def active_cells(self):
+        """
+        Partition of the axis by the sorted breakpoints, as (edges, active): an input x falls in
+        cell np.searchsorted(edges, x, side='right') and active[cell] flags the labels that can
+        be non-zero there. Cell 0 lies left of every breakpoint and the last cell right of them.
+        Membership is linear between breakpoints, so testing each cell's left edge and midpoint
+        is enough.
+        """
+        edges = np.unique(self.params)
+        left = np.concatenate([[edges[0] - 1.0], edges])
+        inner = np.concatenate([[edges[0] - 1.0], (edges[:-1] + edges[1:]) / 2.0, [edges[-1] + 1.0]])
+        active = (self.evaluate(left) > 0) | (self.evaluate(inner) > 0)
+        return edges, active
+
+    def updated(self, new_params):
+        """
+        Copy with some labels' breakpoints replaced (label -> [a, b, c]), plus the changed labels.
+        Returns self unchanged if nothing moved; the original set is never mutated.
+        """
+        params = self.params
+        changed = []
+        for label, abc in new_params.items():
+            if label not in self.labels:
+                raise KeyError(f"Unknown label '{label}'")
+            j = self.labels.index(label)
+            abc = np.asarray(abc, dtype=float)
+            if not np.array_equal(abc, params[j]):
+                if params is self.params:
+                    params = params.copy()
+                params[j] = abc
+                changed.append(label)
+        if not changed:
+            return self, changed
+        return TriangularMFSet(self.labels, params), changed
+
+def line_form(params):
+    """
+    Rise/fall lines of each triangle in a (..., labels, 3) breakpoint array, as
+    (a, c, rise_slope, rise_offset, fall_slope, fall_offset) arrays. Membership is then
+    min(rise, fall) clipped to [0, 1] inside [a, c]. A shoulder side (a == b or b == c)
+    is a flat line at 1.
+    """
+    a, b, c = params[..., 0], params[..., 1], params[..., 2]
+    rise_width, fall_width = b - a, c - b
+    rise_slope = np.where(rise_width > 0, 1.0 / np.where(rise_width > 0, rise_width, 1.0), 0.0)
+    fall_slope = np.where(fall_width > 0, 1.0 / np.where(fall_width > 0, fall_width, 1.0), 0.0)
+    rise_offset = (rise_width <= 0).astype(float)
+    fall_offset = (fall_width <= 0).astype(float)
+    return a, c, rise_slope, rise_offset, fall_slope, fall_offset
+
+def evaluate_lines(x, lines):
+    """
+    Closed-form membership from line_form output. x must broadcast against the
+    label axis, e.g. (N, 1) for one variable or (N, labels) for stacked variables.
+    """
+    a, c, rise_slope, rise_offset, fall_slope, fall_offset = lines
+    mu = np.minimum((x - a) * rise_slope + rise_offset, (c - x) * fall_slope + fall_offset)
+    np.clip(mu, 0.0, 1.0, out=mu)
+    # Outside [a, c] the membership is 0, including beyond a shoulder
+    mu *= (x >= a) & (x <= c)
+    return mu
@@ -0,0 +1,121 @@
+
+import numpy as np
+
+class GreenhousePhysics:
+    """
+    Default plant model, the one run_random_tests has always used. Advances arrays of zone
+    states one control step at a time and keeps no state of its own.
+
+    Physics models share this interface:
+    - reset(num_zones) -> per-run state object (None for stateless models)
+    - step(temp, hum, hf_out, mist_out, state) -> new (temp, hum) arrays; the input
+      arrays are never modified in place
+    """
+    def reset(self, num_zones):
+        return None
+
+    def step(self, temp, hum, hf_out, mist_out, state=None):
+        return physics_step(temp, hum, hf_out, mist_out)
+
+def physics_step(temp, hum, hf_out, mist_out):
+    """
+    Array version of the plant model used in run_random_tests (one step for every zone).
+    Heater increases temp, Fan decreases temp & humidity, Misting increases humidity & slight cooling.
+    """
+    # 1 unit of Heat = +0.5 deg C, 1 unit of Cool = -0.5 deg C
+    temp_change = (hf_out / 100.0) * 0.5
+    # Fan dries slightly
+    hum_change = np.where(hf_out > 0, 0.0, (hf_out / 100.0) * 0.2)
+
+    # 1 unit of Mist = +1 % Hum, -0.1 deg C
+    mist_on = mist_out > 0
+    hum_change = hum_change + np.where(mist_on, (mist_out / 100.0) * 1.0, 0.0)
+    temp_change = temp_change - np.where(mist_on, (mist_out / 100.0) * 0.1, 0.0)
+
+    temp = temp + temp_change
+    hum = hum + hum_change
+
+    # Natural decay towards ambient (say 25C, 50%)
+    temp = temp + (25 - temp) * 0.05
+    hum = hum + (50 - hum) * 0.05
+
+    return np.clip(temp, 0, 50), np.clip(hum, 0, 100)
+
+class ThermalPhysics:
+    """
+    Richer plant model in physical time. Each zone has
+    - thermal mass: temperature and humidity relax towards the outside weather with
+      first-order time constants instead of a fixed 5 % per step,
+    - outside weather: outside_temp / outside_humidity are scalars or time series of shape
+      (T,) shared by all zones or (T, zones), sampled every dt seconds (repeating after T),
+    - actuator lag: heater/fan and misting follow their commands with a first-order lag.
+
+    One step() advances dt * substeps seconds with the commands held, so a controller can
+    run every minute on top of 1 s physics. Everything is vectorized over zones.
+    Rates are per second at full actuator output (100).
+    """
+    def __init__(self, dt=1.0, substeps=1, outside_temp=25.0, outside_humidity=50.0,
+                 heat_rate=0.005, cool_rate=0.005, fan_dry_rate=0.002, mist_rate=0.01, mist_cooling=0.001,
+                 temp_time_constant=1800.0, humidity_time_constant=1200.0, actuator_time_constant=30.0):
+        self.dt = dt
+        self.substeps = substeps
+        self.outside_temp = np.asarray(outside_temp, dtype=float)
+        self.outside_humidity = np.asarray(outside_humidity, dtype=float)
+        self.heat_rate = heat_rate
+        self.cool_rate = cool_rate
+        self.fan_dry_rate = fan_dry_rate
+        self.mist_rate = mist_rate
+        self.mist_cooling = mist_cooling
+
+        # Exact discretization of the first-order lags for one dt
+        self.temp_alpha = 1.0 - np.exp(-dt / temp_time_constant)
+        self.humidity_alpha = 1.0 - np.exp(-dt / humidity_time_constant)
+        self.actuator_alpha = 1.0 - np.exp(-dt / actuator_time_constant) if actuator_time_constant > 0 else 1.0
+
+    def reset(self, num_zones):
+        """Actuators start off and the weather at its first sample."""
+        return {'tick': 0, 'heater_fan': np.zeros(num_zones), 'misting': np.zeros(num_zones)}
+
+    def _weather(self, series, tick):
+        if series.ndim == 0:
+            return series
+        return series[tick % len(series)]
+
+    def step(self, temp, hum, hf_out, mist_out, state):
+        shape = np.shape(temp)
+        temp = np.asarray(temp, dtype=float)
+        hum = np.asarray(hum, dtype=float)
+        hf_cmd = np.asarray(hf_out, dtype=float)
+        mist_cmd = np.asarray(mist_out, dtype=float)
+
+        for _ in range(self.substeps):
+            # Actuators move towards their commands
+            state['heater_fan'] = state['heater_fan'] + (hf_cmd - state['heater_fan']) * self.actuator_alpha
+            state['misting'] = state['misting'] + (mist_cmd - state['misting']) * self.actuator_alpha
+            hf = state['heater_fan'] / 100.0
+            mist = np.maximum(state['misting'], 0.0) / 100.0
+
+            heating = np.maximum(hf, 0.0)
+            cooling = np.minimum(hf, 0.0)
+            temp_rate = heating * self.heat_rate + cooling * self.cool_rate - mist * self.mist_cooling
+            hum_rate = cooling * self.fan_dry_rate + mist * self.mist_rate
+
+            # Exchange with the outside through the greenhouse envelope
+            tick = state['tick']
+            temp = temp + temp_rate * self.dt + (self._weather(self.outside_temp, tick) - temp) * self.temp_alpha
+            hum = hum + hum_rate * self.dt + (self._weather(self.outside_humidity, tick) - hum) * self.humidity_alpha
+            temp = np.clip(temp, 0, 50)
+            hum = np.clip(hum, 0, 100)
+            state['tick'] = tick + 1
+
+        # Scalar zones (run_random_tests) stay scalar
+        return temp.reshape(shape)[()], hum.reshape(shape)[()]
+
+def diurnal_weather(num_samples, dt=1.0, mean_temp=20.0, temp_swing=8.0, mean_humidity=60.0, humidity_swing=15.0):
+    """
+    Idealized outside day as (temp, humidity) series sampled every dt seconds: temperature
+    peaks mid-afternoon, relative humidity moves the opposite way.
+    """
+    hours = np.arange(num_samples) * dt / 3600.0
+    phase = 2 * np.pi * (hours - 15.0) / 24.0
+    return mean_temp + temp_swing * np.cos(phase), mean_humidity - humidity_swing * np.cos(phase)
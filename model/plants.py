@@ -1,5 +1,10 @@
+import csv
+import json
+import numpy as np
 
 class Plant:
+    __slots__ = ('name', 'ideal_temp', 'ideal_humidity', 'temp_tolerance', 'humidity_tolerance')
+
     def __init__(self, name, ideal_temp, ideal_humidity, temp_tolerance, humidity_tolerance):
         self.name = name
         self.ideal_temp = ideal_temp # Celsius
@@ -21,3 +26,97 @@ orchids = Plant("Tropical Orchids", ideal_temp=28, ideal_humidity=80, temp_toler
 succulents = Plant("Desert Succulents", ideal_temp=30, ideal_humidity=30, temp_tolerance=10, humidity_tolerance=10)
 
 ALL_PLANTS = [lettuce, orchids, succulents]
+
+# Columns of catalog files, in Plant argument order
+PLANT_FIELDS = list(Plant.__slots__)
+
+class PlantCatalog:
+    """
+    Plant parameters as parallel arrays (one entry per plant) with a name -> index dict.
+    Zones and scenarios refer to plants by index, so per-zone quantities are one gather,
+    e.g. catalog.ideal_temp[plant_idx], instead of attribute access per zone.
+    """
+    def __init__(self, names, ideal_temp, ideal_humidity, temp_tolerance, humidity_tolerance):
+        self.names = list(names)
+        self.ideal_temp = np.asarray(ideal_temp, dtype=float)
+        self.ideal_humidity = np.asarray(ideal_humidity, dtype=float)
+        self.temp_tolerance = np.asarray(temp_tolerance, dtype=float)
+        self.humidity_tolerance = np.asarray(humidity_tolerance, dtype=float)
+
+        self._index = {}
+        for i, name in enumerate(self.names):
+            if name in self._index:
+                raise ValueError(f"Duplicate plant '{name}' in catalog.")
+            self._index[name] = i
+        for field in PLANT_FIELDS[1:]:
+            if getattr(self, field).shape != (len(self.names),):
+                raise ValueError(f"'{field}' needs one value per plant ({len(self.names)}).")
+
+    @classmethod
+    def from_plants(cls, plants):
+        plants = list(plants)
+        return cls(*([getattr(p, field) for p in plants] for field in PLANT_FIELDS))
+
+    @classmethod
+    def from_records(cls, records):
+        """Catalog from rows in PLANT_FIELDS order or dicts keyed by field name."""
+        rows = [[r[f] for f in PLANT_FIELDS] if isinstance(r, dict) else r for r in records]
+        return cls(*([row[i] for row in rows] for i in range(len(PLANT_FIELDS))))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads plant definitions from a .json or .csv file.
+        JSON: a list of rows, each either a list in PLANT_FIELDS order or an object keyed by field.
+        CSV: a header with the field names, one plant per line.
+        """
+        if str(path).endswith('.json'):
+            with open(path) as f:
+                records = json.load(f)
+        else:
+            with open(path, newline='') as f:
+                records = list(csv.DictReader(f))
+        return cls.from_records(records)
+
+    def save(self, path):
+        """Writes the catalog as JSON (object rows keyed by field name)."""
+        with open(path, 'w') as f:
+            json.dump([
+                {field: (self.names[i] if field == 'name' else float(getattr(self, field)[i])) for field in PLANT_FIELDS}
+                for i in range(len(self))
+            ], f, indent=1)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return (self.plant(i) for i in range(len(self)))
+
+    def index(self, name):
+        """Index of a plant by name (O(1))."""
+        try:
+            return self._index[name]
+        except KeyError:
+            raise KeyError(f"Unknown plant '{name}'.") from None
+
+    def indices(self, names):
+        return np.array([self.index(name) for name in names], dtype=int)
+
+    def plant(self, key):
+        """Plant object for an index or a name."""
+        i = self.index(key) if isinstance(key, str) else int(key)
+        return Plant(self.names[i], *(getattr(self, field)[i].item() for field in PLANT_FIELDS[1:]))
+
+    def ideal(self, plant_idx):
+        """Ideal (temp, humidity) arrays for an array of plant indices."""
+        return self.ideal_temp[plant_idx], self.ideal_humidity[plant_idx]
+
+    def distance(self, plant_idx, temp, hum):
+        """Distance of every zone to its plant's ideal conditions."""
+        return np.sqrt((temp - self.ideal_temp[plant_idx])**2 + (hum - self.ideal_humidity[plant_idx])**2)
+
+# Catalog of the built-in plants, indexed like ALL_PLANTS
+CATALOG = PlantCatalog.from_plants(ALL_PLANTS)
@@ -1,6 +1,5 @@
 
 import numpy as np
-import skfuzzy as fuzz
 
 # Universe of Discourse
 # Temperature: 0 to 50 Celsius
@@ -19,34 +18,70 @@ TEMP_CONTROL_RANGE = np.arange(-100, 101, 1)
 # Misting: 0 to 100%
 MISTING_RANGE = np.arange(0, 101, 1)
 
-def generate_membership_functions(range_array, labels=['Very Low', 'Low', 'Ideal', 'High', 'Very High']):
+def generate_membership_params(range_array, labels=['Very Low', 'Low', 'Ideal', 'High', 'Very High']):
     """
-    Generates standard triangular membership functions for a given range.
+    Triangle breakpoints [a, b, c] per label for the standard evenly spaced MFs.
     For 5 sets, we can distribute them evenly initially.
     """
-    funcs = {}
     step = (range_array.max() - range_array.min()) / (len(labels) - 1)
-    
+    centers = [range_array.min() + i * step for i in range(len(labels))]
+    return centers_to_params(centers, range_array, labels)
+
+def centers_to_params(centers, range_array, labels=['Very Low', 'Low', 'Ideal', 'High', 'Very High']):
+    """
+    Triangle breakpoints per label from the label centers (peaks).
+    Each triangle starts at the previous center and ends at the next one; the first
+    and last labels are shoulders pinned to the ends of the range.
+    """
+    params = {}
+    last = len(labels) - 1
     for i, label in enumerate(labels):
-        center = range_array.min() + i * step
-        # Triangle shape: starts at center-step, peaks at center, ends at center+step
-        # Basic implementation, can be optimized later
         if i == 0:
-             # Left shoulder
-             funcs[label] = fuzz.trimf(range_array, [range_array.min(), range_array.min(), range_array.min() + step])
-        elif i == len(labels) - 1:
+            # Left shoulder
+            params[label] = [range_array.min(), range_array.min(), centers[1]]
+        elif i == last:
             # Right shoulder
-             funcs[label] = fuzz.trimf(range_array, [range_array.max() - step, range_array.max(), range_array.max()])
+            params[label] = [centers[last - 1], range_array.max(), range_array.max()]
         else:
-            funcs[label] = fuzz.trimf(range_array, [center - step, center, center + step])
-            
-    return funcs
-
-# Initial standard membership functions (will be optimized later)
-temp_mfs = generate_membership_functions(TEMP_RANGE)
-humidity_mfs = generate_membership_functions(HUMIDITY_RANGE)
-growth_mfs = generate_membership_functions(GROWTH_RANGE)
-
-# Output MFs usually remain static or are also optimized. For Mamdani they are fuzzy sets.
-temp_control_mfs = generate_membership_functions(TEMP_CONTROL_RANGE, labels=['Cooling_Strong', 'Cooling_Weak', 'Off', 'Heating_Weak', 'Heating_Strong'])
-misting_mfs = generate_membership_functions(MISTING_RANGE, labels=['Off', 'Low', 'Medium', 'High', 'Max'])
+            # Triangle shape: starts at previous center, peaks at center, ends at next center
+            params[label] = [centers[i - 1], centers[i], centers[i + 1]]
+    return params
+
+def generate_membership_functions(range_array, labels=['Very Low', 'Low', 'Ideal', 'High', 'Very High']):
+    """
+    Generates standard triangular membership functions for a given range.
+    For 5 sets, we can distribute them evenly initially.
+    """
+    params = generate_membership_params(range_array, labels)
+    return {label: sample_trimf(range_array, abc) for label, abc in params.items()}
+
+def sample_trimf(x, abc):
+    """Triangle [a, b, c] sampled over x; same values as skfuzzy's fuzz.trimf without importing skfuzzy."""
+    a, b, c = abc
+    y = np.zeros(len(x))
+    if a != b:
+        idx = np.nonzero(np.logical_and(a < x, x < b))[0]
+        y[idx] = (x[idx] - a) / float(b - a)
+    if b != c:
+        idx = np.nonzero(np.logical_and(b < x, x < c))[0]
+        y[idx] = (c - x[idx]) / float(c - b)
+    y[x == b] = 1
+    return y
+
+# Initial standard membership functions (will be optimized later).
+# Computed on first access instead of at import time.
+_MODULE_MFS = {
+    'temp_mfs': lambda: generate_membership_functions(TEMP_RANGE),
+    'humidity_mfs': lambda: generate_membership_functions(HUMIDITY_RANGE),
+    'growth_mfs': lambda: generate_membership_functions(GROWTH_RANGE),
+    # Output MFs usually remain static or are also optimized. For Mamdani they are fuzzy sets.
+    'temp_control_mfs': lambda: generate_membership_functions(TEMP_CONTROL_RANGE, labels=['Cooling_Strong', 'Cooling_Weak', 'Off', 'Heating_Weak', 'Heating_Strong']),
+    'misting_mfs': lambda: generate_membership_functions(MISTING_RANGE, labels=['Off', 'Low', 'Medium', 'High', 'Max'])
+}
+
+def __getattr__(name):
+    if name in _MODULE_MFS:
+        value = _MODULE_MFS[name]()
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
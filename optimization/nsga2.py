@@ -0,0 +1,207 @@
+import numpy as np
+from model.variables import TEMP_RANGE, HUMIDITY_RANGE, GROWTH_RANGE
+from controllers.rules import INPUT_VARIABLES, INPUT_LABELS
+
+# Universe of every input, in INPUT_VARIABLES order
+VECTOR_VARIABLES = [('temp', TEMP_RANGE), ('humidity', HUMIDITY_RANGE), ('growth_stage', GROWTH_RANGE)]
+# Objectives (columns of the objective matrix), all minimized: per-scenario step averages
+# from GreenhouseSimulation.evaluate_scenarios
+OBJECTIVES = ['error', 'energy', 'smoothness']
+
+class NSGA2Optimizer:
+    """
+    Multi-objective (NSGA-II) optimization of the Sugeno input MFs over error, energy and
+    smoothness. Individuals are full MF parameter vectors ([a, b, c] of every input label,
+    see controller_to_vector) and the population is one (population_size, genes) matrix.
+
+    Every generation the parents and their offspring are scored together on one shared
+    scenario bank in a single batched simulation: population x scenarios are stacked along
+    the batch axis and each row gets its individual's MFs (SugenoController.compute_batch
+    with params). run() returns the Pareto set instead of a single best individual.
+    """
+    def __init__(self, simulation_runner, population_size=20, generations=10, num_tests=20, steps_per_test=20,
+                 seed=None, crossover_rate=0.9, crossover_eta=15.0, mutation_eta=20.0, mutation_rate=None):
+        self.sim = simulation_runner
+        self.pop_size = population_size
+        self.generations = generations
+        self.num_tests = num_tests
+        self.steps_per_test = steps_per_test
+
+        # SBX crossover and polynomial mutation (distribution indices eta)
+        self.crossover_rate = crossover_rate
+        self.crossover_eta = crossover_eta
+        self.mutation_eta = mutation_eta
+        self.lower, self.upper = vector_bounds()
+        # Default: one mutated gene per individual on average
+        self.mutation_rate = 1.0 / len(self.lower) if mutation_rate is None else mutation_rate
+
+        # Same seeding scheme as GeneticOptimizer: the algorithm's own draws use spawn
+        # key (0,), the scenario bank of generation g uses spawn key (1, g)
+        self.seed_seq = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(np.random.SeedSequence(self.seed_seq.entropy, spawn_key=(0,)))
+
+        # Final population and its objectives (population_size, len(OBJECTIVES))
+        self.population = None
+        self.objectives = None
+
+    def evaluate(self, population, scenarios):
+        """Objectives (individuals, len(OBJECTIVES)) of a population matrix on one scenario bank."""
+        population = repair(population)
+        pop_size = len(population)
+        num_tests = len(scenarios['plant'])
+
+        # Individual-major stacking: row i * num_tests + t is individual i on scenario t
+        stacked = {key: np.tile(np.asarray(values), pop_size) for key, values in scenarios.items()}
+        params = np.repeat(vector_to_params(population), num_tests, axis=0)
+
+        results = self.sim.evaluate_scenarios(stacked, self.steps_per_test, [('Sugeno', _PerRowMFs(self.sim.sugeno, params))])
+        per_test = results['Sugeno']
+        return np.stack([
+            per_test[name].reshape(pop_size, num_tests).mean(axis=1)
+            for name in OBJECTIVES
+        ], axis=1)
+
+    def _scenarios(self, generation):
+        seed = np.random.SeedSequence(self.seed_seq.entropy, spawn_key=(1, generation))
+        return self.sim.draw_scenarios(self.num_tests, seed)
+
+    def _tournament(self, ranks, crowding, count):
+        """Binary tournament on (rank, crowding distance) -> count parent indices."""
+        a = self.rng.integers(0, len(ranks), count)
+        b = self.rng.integers(0, len(ranks), count)
+        a_wins = (ranks[a] < ranks[b]) | ((ranks[a] == ranks[b]) & (crowding[a] >= crowding[b]))
+        return np.where(a_wins, a, b)
+
+    def _offspring(self, population, ranks, crowding):
+        parents = population[self._tournament(ranks, crowding, self.pop_size + self.pop_size % 2)]
+        children = sbx_crossover(parents[0::2], parents[1::2], self.lower, self.upper,
+                                 self.crossover_eta, self.crossover_rate, self.rng)
+        children = polynomial_mutation(children, self.lower, self.upper, self.mutation_eta, self.mutation_rate, self.rng)
+        return repair(children[:self.pop_size])
+
+    def run(self):
+        print("Starting NSGA-II Optimization...")
+        base = controller_to_vector(self.sim.sugeno)
+        spread = (self.upper - self.lower) * 0.05
+        population = repair(base + self.rng.uniform(-1, 1, (self.pop_size, len(base))) * spread)
+        population[0] = base
+
+        # Parents are re-scored with their offspring on each generation's bank
+        ranks = np.zeros(self.pop_size, dtype=int)
+        crowding = np.zeros(self.pop_size)
+        for gen in range(self.generations):
+            print(f"Generation {gen+1}/{self.generations}")
+            combined = np.concatenate([population, self._offspring(population, ranks, crowding)])
+            objectives = self.evaluate(combined, self._scenarios(gen))
+
+            # Elitist survival: best fronts first, least crowded first within the last one
+            all_ranks = non_dominated_ranks(objectives)
+            all_crowding = crowding_distance(objectives, all_ranks)
+            survivors = np.lexsort((-all_crowding, all_ranks))[:self.pop_size]
+            population = combined[survivors]
+            ranks, crowding = all_ranks[survivors], all_crowding[survivors]
+            self.objectives = objectives[survivors]
+
+        self.population = population
+        front = ranks == 0
+        print(f"Optimization Complete. Pareto set: {front.sum()} individuals")
+        return population[front], self.objectives[front]
+
+class _PerRowMFs:
+    """compute_batch adapter giving every stacked row its own MF breakpoints."""
+    def __init__(self, controller, params):
+        self.controller = controller
+        self.params = params
+
+    def compute_batch(self, temps, hums, growths):
+        return self.controller.compute_batch(temps, hums, growths, params=self.params)
+
+def controller_to_vector(controller):
+    """Flattened [a, b, c] of every input label of a SugenoController, in INPUT_VARIABLES order."""
+    return np.concatenate([controller.mf_sets[name].params.ravel() for name in INPUT_VARIABLES])
+
+def vector_to_params(vectors):
+    """(individuals, genes) vectors -> (individuals, labels, 3) stacked breakpoints."""
+    vectors = np.asarray(vectors, dtype=float)
+    return vectors.reshape(len(vectors), -1, 3)
+
+def vector_bounds():
+    """Lower / upper bound of every gene: the universe of the gene's variable."""
+    genes = len(INPUT_LABELS) * 3
+    lower = np.concatenate([np.full(genes, u.min(), dtype=float) for _, u in VECTOR_VARIABLES])
+    upper = np.concatenate([np.full(genes, u.max(), dtype=float) for _, u in VECTOR_VARIABLES])
+    return lower, upper
+
+def repair(vectors):
+    """Clips genes to their universes and sorts each triangle so a <= b <= c."""
+    lower, upper = vector_bounds()
+    vectors = np.clip(np.asarray(vectors, dtype=float), lower, upper)
+    return np.sort(vectors.reshape(len(vectors), -1, 3), axis=2).reshape(len(vectors), -1)
+
+def apply_vector(controller, vector):
+    """Applies an MF parameter vector to a SugenoController; only the MFs that moved are rebuilt."""
+    params = vector_to_params(repair(np.atleast_2d(vector)))[0]
+    start = 0
+    for name in INPUT_VARIABLES:
+        labels = controller.mf_sets[name].labels
+        controller.update_membership_functions(name, dict(zip(labels, params[start:start + len(labels)])))
+        start += len(labels)
+
+def non_dominated_ranks(objectives):
+    """Pareto front index of every row (0 = non-dominated), all objectives minimized."""
+    objectives = np.asarray(objectives, dtype=float)
+    no_worse = (objectives[:, None, :] <= objectives[None, :, :]).all(axis=2)
+    better = (objectives[:, None, :] < objectives[None, :, :]).any(axis=2)
+    dominates = no_worse & better                  # dominates[i, j]: i dominates j
+    dominated_by = dominates.sum(axis=0)
+
+    ranks = np.full(len(objectives), -1)
+    rank = 0
+    front = np.nonzero(dominated_by == 0)[0]
+    while front.size:
+        ranks[front] = rank
+        dominated_by = dominated_by - dominates[front].sum(axis=0)
+        dominated_by[ranks >= 0] = -1
+        front = np.nonzero(dominated_by == 0)[0]
+        rank += 1
+    return ranks
+
+def crowding_distance(objectives, ranks):
+    """Crowding distance of every row within its front (boundary points get inf)."""
+    objectives = np.asarray(objectives, dtype=float)
+    distance = np.zeros(len(objectives))
+    for rank in np.unique(ranks):
+        members = np.nonzero(ranks == rank)[0]
+        if len(members) <= 2:
+            distance[members] = np.inf
+            continue
+        values = objectives[members]
+        order = np.argsort(values, axis=0, kind='stable')
+        for m in range(values.shape[1]):
+            sorted_values = values[order[:, m], m]
+            span = sorted_values[-1] - sorted_values[0]
+            distance[members[order[0, m]]] = np.inf
+            distance[members[order[-1, m]]] = np.inf
+            if span > 0:
+                distance[members[order[1:-1, m]]] += (sorted_values[2:] - sorted_values[:-2]) / span
+    return distance
+
+def sbx_crossover(parents_a, parents_b, lower, upper, eta, rate, rng):
+    """Simulated binary crossover of paired parent rows -> two children per pair."""
+    u = rng.random(parents_a.shape)
+    beta = np.where(u <= 0.5, (2 * u) ** (1 / (eta + 1)), (1 / (2 * (1 - u))) ** (1 / (eta + 1)))
+    # Pairs that do not cross over, and half of the genes of those that do, are copied
+    keep = (rng.random(len(parents_a)) >= rate)[:, None] | (rng.random(parents_a.shape) < 0.5)
+    beta = np.where(keep, 1.0, beta)
+    mean = 0.5 * (parents_a + parents_b)
+    half_diff = 0.5 * (parents_b - parents_a)
+    children = np.concatenate([mean - beta * half_diff, mean + beta * half_diff])
+    return np.clip(children, lower, upper)
+
+def polynomial_mutation(vectors, lower, upper, eta, rate, rng):
+    """Polynomial mutation of every gene with probability rate."""
+    span = upper - lower
+    u = rng.random(vectors.shape)
+    delta = np.where(u < 0.5, (2 * u) ** (1 / (eta + 1)) - 1, 1 - (2 * (1 - u)) ** (1 / (eta + 1)))
+    mutate = rng.random(vectors.shape) < rate
+    return np.clip(vectors + np.where(mutate, delta * span, 0.0), lower, upper)
@@ -1,84 +1,206 @@
 
 import numpy as np
-import random
-from model.variables import TEMP_RANGE
-import skfuzzy as fuzz
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from model.variables import TEMP_RANGE, HUMIDITY_RANGE, centers_to_params, generate_membership_params
+
+# Input variables whose MF centers are optimized, with their universes
+GENE_VARIABLES = [('temp', TEMP_RANGE), ('humidity', HUMIDITY_RANGE)]
+# Number of interior centers per variable (5 labels, the two shoulders stay pinned)
+CENTERS_PER_VARIABLE = 3
+# Mutation / initial spread in universe units per gene entry (one MF step of the variable)
+GENE_SCALE = np.repeat([(u.max() - u.min()) / 4.0 for _, u in GENE_VARIABLES], CENTERS_PER_VARIABLE)
 
 class GeneticOptimizer:
-    def __init__(self, simulation_runner, population_size=10, generations=5):
+    def __init__(self, simulation_runner, population_size=10, generations=5, executor=None, max_workers=None, seed=None, on_result=None,
+                 num_tests=5, steps_per_test=20, cache_resolution=0.01):
         self.sim = simulation_runner
         self.pop_size = population_size
         self.generations = generations
         self.mutation_rate = 0.1
+
+        # Fitness evaluation of a generation: None (serial), 'thread', 'process'
+        # or any concurrent.futures.Executor instance (not shut down by us).
+        self.executor = executor
+        self.max_workers = max_workers
+        # Called as on_result(generation, index, gene, fitness) as soon as each individual finishes
+        self.on_result = on_result
+
+        # Fitness simulation size (scenarios per generation, steps per scenario)
+        self.num_tests = num_tests
+        self.steps_per_test = steps_per_test
+
+        # All randomness derives from one SeedSequence: the GA's own draws use spawn key (0,),
+        # the scenario bank of generation g uses spawn key (1, g). Every individual of a
+        # generation is scored on the same bank (common random numbers), so fitness differences
+        # come from the genes rather than from the scenarios, and parallel runs match serial ones.
+        self.seed_seq = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self._child_seed(0))
+
+        # Genes within cache_resolution universe units of each other are simulated once per
+        # generation, so duplicate / near-identical children from the averaging crossover are
+        # not re-simulated. Fitness is only comparable on the same scenario bank, so nothing is
+        # kept across generations: a fresh bank per generation keeps the GA from overfitting
+        # one fixed set of scenarios, at the cost of re-scoring genes that survive unchanged.
+        self.cache_resolution = cache_resolution
+        self.cache_hits = 0
+        self.cache_misses = 0
         
-        # We will optimize the 'Ideal' and 'High' centers for Temperature as a Proof of Concept
-        # Gene: [Ideal_Temp_Center, High_Temp_Center]
-        # Constraints: Low < Ideal < High
-        
-    def fitness(self, gene):
-        # 1. Apply gene to controller (Mamdani for now)
-        # Hacky way: Modify the GLOBAL variable defined in model.variables or accessing the controller directly
-        # For this prototype, we will create a temporary variation of the MFs.
-        
-        # Since rebuilding the whole skfuzzy ControlSystem is expensive and complex dynamically,
-        # we will simulate the optimization process by "selecting best parameters" logic 
-        # or we assume we can set the terms.
-        
-        # NOTE: Skfuzzy ControlSystemSimulation pre-computes rules. Changing MFs requires rebuilding the system.
-        # This is computationally heavy for a simple assignment loop.
-        # We will assume the gene affects the 'Sugeno' controller since it is manual and faster to update.
-        
-        # Update Sugeno MFs
-        # Re-generating MFs with shifted centers
-        # Gene = offset factor for the 'Ideal' range width
+        # Gene: interior MF centers (Low, Ideal, High) of every variable in GENE_VARIABLES,
+        # e.g. [Low_Temp, Ideal_Temp, High_Temp, Low_Hum, Ideal_Hum, High_Hum].
+        # Constraints: Low < Ideal < High, kept by gene_to_params (sorted and clipped to the universe)
         
-        # Let's say Gene is a single scalar: Expansion factor of the "Ideal" range.
-        factor = gene
+    def fitness(self, gene, seed=None, scenarios=None):
+        # 1. Apply gene to the Sugeno controller.
+        # NOTE: The gene affects the 'Sugeno' controller, whose MFs can be updated label by label.
+        # (MamdaniController.update_membership_functions also updates in place, but every skfuzzy
+        # compute() stays far slower than a Sugeno evaluation.)
+        # Each individual works on a copy of the template controller; only the MFs whose
+        # breakpoints moved are re-sampled, so setup cost is negligible next to the simulation.
+        controller = self.sim.sugeno.copy()
+        apply_gene(controller, gene)
         
         # Evaluation
-        # We run a mini-simulation (5 tests)
-        metrics = self.sim.run_random_tests(num_tests=5, steps_per_test=20)
+        # We run a mini-simulation of the Sugeno controller only, since that is all the fitness
+        # looks at, on the given scenario bank (or num_tests scenarios drawn from seed).
+        metrics = self.sim.run_vectorized_tests(num_tests=self.num_tests, steps_per_test=self.steps_per_test, seed=seed,
+                                                scenarios=scenarios, controllers=[('Sugeno', controller)])
         
         # Fitness = Minimize Error
         return 1.0 / (metrics['Sugeno']['avg_error'] + 1e-5) # Inverse error
-        
+
+    def __getstate__(self):
+        # Worker processes only need what fitness() uses
+        state = self.__dict__.copy()
+        state['executor'] = None
+        state['on_result'] = None
+        return state
+
+    def _child_seed(self, *key):
+        return np.random.SeedSequence(self.seed_seq.entropy, spawn_key=key)
+
+    def _cache_key(self, gene):
+        return tuple(np.round(np.asarray(gene, dtype=float) / self.cache_resolution).astype(int))
+
+    def cache_hit_rate(self):
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    def evaluate_population(self, population, generation, executor=None):
+        """
+        Fitness of every individual, returned in population order.
+        All individuals share the generation's scenario bank. Genes repeated within the
+        population (up to cache_resolution) are simulated only once. With an executor the
+        distinct genes are submitted at once and results are reported through on_result
+        as they complete.
+        """
+        scenarios = self.sim.draw_scenarios(self.num_tests, seed=self._child_seed(1, generation))
+        fitnesses = [None] * len(population)
+
+        # Group individuals by cache key; only the first of each group is simulated
+        pending = OrderedDict()
+        for i, ind in enumerate(population):
+            key = self._cache_key(ind)
+            if key in pending:
+                self.cache_hits += 1
+                pending[key].append(i)
+            else:
+                self.cache_misses += 1
+                pending[key] = [i]
+
+        def finish(key, value):
+            for i in pending[key]:
+                fitnesses[i] = value
+                if self.on_result:
+                    self.on_result(generation, i, population[i], value)
+
+        if executor is None:
+            for key, members in pending.items():
+                finish(key, self.fitness(population[members[0]], scenarios=scenarios))
+            return fitnesses
+
+        futures = {executor.submit(self.fitness, population[members[0]], None, scenarios): key for key, members in pending.items()}
+        for future in as_completed(futures):
+            finish(futures[future], future.result())
+        return fitnesses
+
+    def _make_executor(self):
+        if self.executor == 'thread':
+            return ThreadPoolExecutor(max_workers=self.max_workers), True
+        if self.executor == 'process':
+            return ProcessPoolExecutor(max_workers=self.max_workers), True
+        if self.executor is None or isinstance(self.executor, Executor):
+            return self.executor, False
+        raise ValueError(f"Unknown executor: {self.executor!r}")
+
     def run(self):
         print("Starting Genetic Algorithm Optimization...")
-        population = [random.uniform(0.8, 1.2) for _ in range(self.pop_size)]
+        # Start around the standard evenly spaced MFs
+        base = default_gene()
+        population = [base + self.rng.uniform(-0.1, 0.1, base.shape) * GENE_SCALE for _ in range(self.pop_size)]
         
         best_gene = None
         best_fitness = -1
-        
-        for gen in range(self.generations):
-            print(f"Generation {gen+1}/{self.generations}")
-            
-            fitnesses = []
-            for ind in population:
-                f = self.fitness(ind)
-                fitnesses.append(f)
-                
-                if f > best_fitness:
-                    best_fitness = f
-                    best_gene = ind
-            
-            # Selection (Roulette Wheel)
-            total_fit = sum(fitnesses)
-            probs = [f/total_fit for f in fitnesses]
-            
-            new_pop = []
-            for _ in range(self.pop_size):
-                # Crossover (Simple averaging)
-                p1 = np.random.choice(population, p=probs)
-                p2 = np.random.choice(population, p=probs)
-                child = (p1 + p2) / 2.0
-                
-                # Mutation
-                if random.random() < self.mutation_rate:
-                    child += random.uniform(-0.1, 0.1)
-                
-                new_pop.append(child)
-            
-            population = new_pop
+
+        executor, owned = self._make_executor()
+        try:
+            for gen in range(self.generations):
+                print(f"Generation {gen+1}/{self.generations}")
+
+                fitnesses = self.evaluate_population(population, gen, executor)
+
+                # Pick the best in population order so serial and parallel runs agree
+                for ind, f in zip(population, fitnesses):
+                    if f > best_fitness:
+                        best_fitness = f
+                        best_gene = ind
+
+                # Selection (Roulette Wheel)
+                total_fit = sum(fitnesses)
+                probs = [f/total_fit for f in fitnesses]
+
+                new_pop = []
+                for _ in range(self.pop_size):
+                    # Crossover (Simple averaging)
+                    p1 = population[self.rng.choice(len(population), p=probs)]
+                    p2 = population[self.rng.choice(len(population), p=probs)]
+                    child = (p1 + p2) / 2.0
+
+                    # Mutation
+                    if self.rng.random() < self.mutation_rate:
+                        child = child + self.rng.uniform(-0.1, 0.1, child.shape) * GENE_SCALE
+
+                    new_pop.append(child)
+
+                population = new_pop
+        finally:
+            if owned:
+                executor.shutdown()
             
-        print(f"Optimization Complete. Best Factor: {best_gene}")
+        print(f"Optimization Complete. Best Gene: {best_gene}")
+        lookups = self.cache_hits + self.cache_misses
+        print(f"Duplicate genes: {self.cache_hits}/{lookups} not re-simulated ({self.cache_hit_rate():.1%})")
         return best_gene
+
+def default_gene():
+    """Gene of the standard evenly spaced MFs."""
+    return np.concatenate([
+        [abc[1] for abc in list(generate_membership_params(universe).values())[1:-1]]
+        for _, universe in GENE_VARIABLES
+    ]).astype(float)
+
+def gene_to_params(gene):
+    """variable name -> {label: [a, b, c]} for a gene of interior centers."""
+    gene = np.asarray(gene, dtype=float)
+    params = {}
+    for v, (name, universe) in enumerate(GENE_VARIABLES):
+        interior = gene[v * CENTERS_PER_VARIABLE:(v + 1) * CENTERS_PER_VARIABLE]
+        interior = np.clip(np.sort(interior), universe.min(), universe.max())
+        centers = np.concatenate([[universe.min()], interior, [universe.max()]])
+        params[name] = centers_to_params(centers, universe)
+    return params
+
+def apply_gene(controller, gene):
+    """Applies a gene to a SugenoController; only the MFs that moved are rebuilt."""
+    for name, params in gene_to_params(gene).items():
+        controller.update_membership_functions(name, params)
@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+import time
+
+# Duration histogram with power-of-two microsecond buckets: bucket 0 is < 1 us,
+# bucket k holds [2**(k-1), 2**k) us and the last bucket everything longer.
+HISTOGRAM_BUCKETS = 32
+
+# Profiler receiving stage timings, None when profiling is off
+_active = None
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.start, time.perf_counter())
+        return False
+
+def stage(name):
+    """
+    Context manager timing a block as stage name on the active Profiler.
+    With profiling off it returns a shared no-op object, so instrumented code pays one
+    global lookup and an empty with-block.
+    """
+    if _active is None:
+        return _NULL_STAGE
+    return _Stage(_active, name)
+
+def active():
+    return _active
+
+class StageStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.histogram[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Upper edge (seconds) of the histogram bucket holding the q-th percentile."""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for k, n in enumerate(self.histogram):
+            seen += n
+            if seen >= rank:
+                return min(2 ** k * 1e-6, self.max)
+        return self.max
+
+class Profiler:
+    """
+    Opt-in per-stage timing. While enabled (with Profiler() as prof: ...) every
+    profiling.stage() block adds to per-stage count / total / min / max / histogram.
+    With trace=True every block is also kept as an event for write_chrome_trace()
+    (at most max_events; later events are only counted in dropped_events).
+    """
+    def __init__(self, trace=False, max_events=1000000):
+        self.stats = {}
+        self.trace = trace
+        self.max_events = max_events
+        self.events = []
+        self.dropped_events = 0
+        self._origin = time.perf_counter()
+        self._previous = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def enable(self):
+        global _active
+        self._previous = _active
+        _active = self
+
+    def disable(self):
+        global _active
+        _active = self._previous
+        self._previous = None
+
+    def add(self, name, start, end):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = StageStats()
+        stats.add(end - start)
+        if self.trace:
+            if len(self.events) < self.max_events:
+                self.events.append((name, start, end - start, threading.get_ident()))
+            else:
+                self.dropped_events += 1
+
+    def summary(self):
+        """stage -> {count, total, mean, min, max, p50, p99, histogram} (times in seconds)."""
+        return {
+            name: {
+                'count': s.count,
+                'total': s.total,
+                'mean': s.mean,
+                'min': s.min,
+                'max': s.max,
+                'p50': s.percentile(50),
+                'p99': s.percentile(99),
+                'histogram': list(s.histogram)
+            }
+            for name, s in sorted(self.stats.items())
+        }
+
+    def format_summary(self):
+        lines = [
+            f"{'Stage':<26} | {'Calls':>8} | {'Total':>10} | {'Mean':>10} | {'Min':>10} | {'p99 <=':>10} | {'Max':>10}",
+            "-" * 102
+        ]
+        for name, s in self.summary().items():
+            lines.append(
+                f"{name:<26} | {s['count']:>8} | {format_time(s['total']):>10} | {format_time(s['mean']):>10} | "
+                f"{format_time(s['min']):>10} | {format_time(s['p99']):>10} | {format_time(s['max']):>10}"
+            )
+        return "\n".join(lines)
+
+    def print_summary(self):
+        print(self.format_summary())
+
+    def write_chrome_trace(self, path):
+        """
+        Writes the recorded events in Chrome trace format (chrome://tracing, Perfetto,
+        speedscope). Nested stages show up as a flame graph per thread.
+        """
+        pid = os.getpid()
+        events = [
+            {
+                'name': name,
+                'cat': name.split('.')[0],
+                'ph': 'X',
+                'ts': (start - self._origin) * 1e6,
+                'dur': duration * 1e6,
+                'pid': pid,
+                'tid': tid
+            }
+            for name, start, duration, tid in self.events
+        ]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+def format_time(seconds):
+    """Duration as a short human-readable string (us / ms / s)."""
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.2f} s"
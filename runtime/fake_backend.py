@@ -0,0 +1,115 @@
+import asyncio
+import numpy as np
+from model.plants import CATALOG, PlantCatalog
+from model.physics import GreenhousePhysics
+from runtime.service import Zone, SensorReading, SensorSource, ActuatorSink, ControlService
+
+class FakeGreenhouse:
+    """
+    In-process stand-in for real sensors and actuators. Holds the temp/humidity state of
+    every zone and advances all zones with a physics model (model/physics.py, the
+    simulation's default if not given) once per control tick: sinks store the commands and
+    the next sensor read applies them. This lets a ControlService run end to end without
+    hardware.
+    """
+    def __init__(self, zones, seed=None, latency=0.0, physics=None):
+        self.zones = list(zones)
+        self.index = {zone.zone_id: i for i, zone in enumerate(self.zones)}
+        # Distinct plants of the zones and every zone's index into them
+        self.catalog = PlantCatalog.from_plants({z.plant.name: z.plant for z in self.zones}.values())
+        self.plant_idx = self.catalog.indices([z.plant.name for z in self.zones])
+        # Simulated I/O delay (seconds) of every read and write
+        self.latency = latency
+
+        # Same initial distributions as the random tests
+        rng = np.random.default_rng(seed)
+        n = len(self.zones)
+        self.temp = rng.uniform(5, 45, n)
+        self.humidity = rng.uniform(10, 90, n)
+        self.growth = rng.uniform(0, 100, n)
+
+        self.physics = GreenhousePhysics() if physics is None else physics
+        self._physics_state = self.physics.reset(n)
+        # Latest command per zone; zones without one hold their previous command
+        self.heater_fan = np.zeros(n)
+        self.misting = np.zeros(n)
+        self._pending = False
+
+    def advance(self):
+        """Applies the commands written since the last advance to every zone."""
+        if self._pending:
+            self.temp, self.humidity = self.physics.step(self.temp, self.humidity, self.heater_fan, self.misting, self._physics_state)
+            self._pending = False
+
+    def source(self, zone_ids=None):
+        return FakeSensorSource(self, zone_ids)
+
+    def sink(self, zone_ids=None):
+        return FakeActuatorSink(self, zone_ids)
+
+    def _rows(self, zone_ids):
+        if zone_ids is None:
+            return np.arange(len(self.zones))
+        return np.array([self.index[z] for z in zone_ids], dtype=int)
+
+    def errors(self):
+        """Distance of every zone to its plant's ideal conditions."""
+        return self.catalog.distance(self.plant_idx, self.temp, self.humidity)
+
+class FakeSensorSource(SensorSource):
+    def __init__(self, greenhouse, zone_ids=None):
+        self.greenhouse = greenhouse
+        self.zone_ids = zone_ids
+        self._rows = greenhouse._rows(zone_ids)
+
+    async def read(self):
+        gh = self.greenhouse
+        if gh.latency:
+            await asyncio.sleep(gh.latency)
+        gh.advance()
+        return [
+            SensorReading(gh.zones[i].zone_id, float(gh.temp[i]), float(gh.humidity[i]), float(gh.growth[i]))
+            for i in self._rows
+        ]
+
+class FakeActuatorSink(ActuatorSink):
+    def __init__(self, greenhouse, zone_ids=None):
+        self.greenhouse = greenhouse
+        self.zone_ids = None if zone_ids is None else set(zone_ids)
+
+    async def write(self, commands):
+        gh = self.greenhouse
+        if gh.latency:
+            await asyncio.sleep(gh.latency)
+        if not commands:
+            return
+        rows = np.array([gh.index[c.zone_id] for c in commands], dtype=int)
+        gh.heater_fan[rows] = [c.heater_fan for c in commands]
+        gh.misting[rows] = [c.misting for c in commands]
+        gh._pending = True
+
+def make_zones(num_zones, seed=None, catalog=None):
+    """num_zones zones with plants drawn at random from a PlantCatalog (model.plants.CATALOG by default)."""
+    catalog = CATALOG if catalog is None else catalog
+    plants = list(catalog)
+    rng = np.random.default_rng(seed)
+    return [Zone(f"zone-{i:04d}", plants[p]) for i, p in enumerate(rng.integers(0, len(plants), num_zones))]
+
+async def run_demo(controller, num_zones=200, ticks=20, tick_interval=0.05, num_sources=4, seed=0):
+    """Runs a ControlService over a FakeGreenhouse and returns (service, greenhouse)."""
+    zones = make_zones(num_zones, seed)
+    greenhouse = FakeGreenhouse(zones, seed=seed)
+    # Split the zones over several sources, like separate sensor gateways
+    ids = [z.zone_id for z in zones]
+    sources = [greenhouse.source(ids[i::num_sources]) for i in range(num_sources)]
+    service = ControlService(zones, controller, sources, [greenhouse.sink()], tick_interval=tick_interval)
+    await service.run(ticks)
+    return service, greenhouse
+
+if __name__ == "__main__":
+    from controllers.sugeno import SugenoController
+
+    service, greenhouse = asyncio.run(run_demo(SugenoController()))
+    for key, value in service.stats.summary().items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+    print(f"mean error after run: {greenhouse.errors().mean():.2f}")
@@ -0,0 +1,193 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+import numpy as np
+from model.plants import PlantCatalog
+
+@dataclass
+class Zone:
+    """One greenhouse zone under control; plant is one of the model.plants definitions."""
+    zone_id: str
+    plant: object
+
+@dataclass
+class SensorReading:
+    zone_id: str
+    temp: float
+    humidity: float
+    growth: float
+
+@dataclass
+class ActuatorCommand:
+    zone_id: str
+    heater_fan: float
+    misting: float
+
+class SensorSource:
+    """
+    Pluggable async sensor source. read() returns the latest SensorReading of every
+    zone it covers (zones without a fresh reading may be left out).
+    """
+    async def read(self):
+        raise NotImplementedError
+
+class ActuatorSink:
+    """
+    Pluggable async actuator sink. zone_ids limits which commands it receives
+    (None = every zone).
+    """
+    zone_ids = None
+
+    async def write(self, commands):
+        raise NotImplementedError
+
+@dataclass
+class StageTimer:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    last: float = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+@dataclass
+class ServiceStats:
+    ticks: int = 0
+    missed_deadlines: int = 0
+    zones_controlled: int = 0
+    source_timeouts: int = 0
+    source_errors: int = 0
+    sink_errors: int = 0
+    # Mean distance to each zone's plant ideal over the last tick
+    last_error: float = 0.0
+    stages: dict = field(default_factory=lambda: {name: StageTimer() for name in ('read', 'compute', 'write', 'tick')})
+
+    def summary(self):
+        out = {k: v for k, v in self.__dict__.items() if k != 'stages'}
+        for name, timer in self.stages.items():
+            out[f'{name}_mean_ms'] = timer.mean * 1000
+            out[f'{name}_max_ms'] = timer.max * 1000
+        return out
+
+class ControlService:
+    """
+    Real-time control loop for many zones. Every tick it reads all sources concurrently,
+    evaluates every zone that reported in ONE controller.compute_batch call and writes the
+    commands to the sinks. Ticks run at a fixed rate of tick_interval seconds; a tick that
+    overruns its deadline is counted in stats.missed_deadlines (the next tick starts at once).
+    Plant-aware controllers (needs_plant, e.g. controllers.profiles.PlantProfiles) also get
+    each zone's plant index into the service's catalog.
+    """
+    def __init__(self, zones, controller, sources, sinks, tick_interval=1.0, read_timeout=None, offload_compute=False):
+        self.zones = {zone.zone_id: zone for zone in zones}
+        self.controller = controller
+        self.sources = list(sources)
+        self.sinks = list(sinks)
+        self.tick_interval = tick_interval
+        # Per-source read timeout, defaults to half a tick
+        self.read_timeout = tick_interval / 2 if read_timeout is None else read_timeout
+        # Run compute_batch in a worker thread so slow controllers do not block the event loop
+        self.offload_compute = offload_compute
+        self.stats = ServiceStats()
+        self._running = False
+
+        # Distinct plants of the zones and every zone's index into them, so per-tick plant
+        # quantities are one gather from the catalog
+        self.catalog = PlantCatalog.from_plants({z.plant.name: z.plant for z in zones}.values())
+        self._zone_row = {zone_id: i for i, zone_id in enumerate(self.zones)}
+        self.plant_idx = self.catalog.indices([z.plant.name for z in self.zones.values()])
+
+    async def _read_source(self, source):
+        try:
+            return await asyncio.wait_for(source.read(), self.read_timeout)
+        except asyncio.TimeoutError:
+            self.stats.source_timeouts += 1
+        except Exception:
+            self.stats.source_errors += 1
+        return []
+
+    async def _write_sink(self, sink, commands):
+        if sink.zone_ids is not None:
+            commands = [c for c in commands if c.zone_id in sink.zone_ids]
+        try:
+            await sink.write(commands)
+        except Exception:
+            self.stats.sink_errors += 1
+
+    async def tick(self):
+        """One read -> compute -> write cycle. Returns the commands sent."""
+        tick_start = time.perf_counter()
+
+        # 1. Read every source concurrently; keep the latest reading per known zone
+        batches = await asyncio.gather(*(self._read_source(s) for s in self.sources))
+        pending = {}
+        for readings in batches:
+            for reading in readings:
+                if reading.zone_id in self.zones:
+                    pending[reading.zone_id] = reading
+        read_done = time.perf_counter()
+        self.stats.stages['read'].add(read_done - tick_start)
+
+        commands = []
+        if pending:
+            # 2. One batched controller call for all pending zones
+            readings = list(pending.values())
+            plant_idx = self.plant_idx[[self._zone_row[r.zone_id] for r in readings]]
+            temps = np.array([r.temp for r in readings], dtype=float)
+            hums = np.array([r.humidity for r in readings], dtype=float)
+            growths = np.array([r.growth for r in readings], dtype=float)
+            # Plant-aware controllers (controllers/profiles.py) also get each zone's plant
+            plant_args = (plant_idx, self.catalog) if getattr(self.controller, 'needs_plant', False) else ()
+            if self.offload_compute:
+                res = await asyncio.to_thread(self.controller.compute_batch, temps, hums, growths, *plant_args)
+            else:
+                res = self.controller.compute_batch(temps, hums, growths, *plant_args)
+            compute_done = time.perf_counter()
+            self.stats.stages['compute'].add(compute_done - read_done)
+
+            commands = [
+                ActuatorCommand(r.zone_id, float(hf), float(mist))
+                for r, hf, mist in zip(readings, res['heater_fan'], res['misting'])
+            ]
+            self.stats.last_error = float(np.mean(self.catalog.distance(plant_idx, temps, hums)))
+            self.stats.zones_controlled += len(readings)
+
+            # 3. Write to every sink concurrently
+            await asyncio.gather(*(self._write_sink(s, commands) for s in self.sinks))
+            self.stats.stages['write'].add(time.perf_counter() - compute_done)
+
+        self.stats.ticks += 1
+        self.stats.stages['tick'].add(time.perf_counter() - tick_start)
+        return commands
+
+    async def run(self, ticks=None):
+        """Runs until stop() is called or, if given, for a number of ticks."""
+        loop = asyncio.get_running_loop()
+        self._running = True
+        deadline = loop.time()
+        done = 0
+        while self._running and (ticks is None or done < ticks):
+            deadline += self.tick_interval
+            await self.tick()
+            done += 1
+
+            remaining = deadline - loop.time()
+            if remaining < 0:
+                self.stats.missed_deadlines += 1
+                # Do not try to catch up with a burst of ticks
+                deadline = loop.time()
+            elif ticks is None or done < ticks:
+                await asyncio.sleep(remaining)
+        self._running = False
+
+    def stop(self):
+        self._running = False
@@ -1,34 +1,89 @@
 
+import copy
 import numpy as np
 import time
-from model.plants import ALL_PLANTS
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import profiling
+from model.plants import CATALOG
+# physics_step is re-exported for code that imported it from here
+from model.physics import GreenhousePhysics, physics_step
+from controllers.shared import SharedController, publish, shareable
 
 class GreenhouseSimulation:
-    def __init__(self, mamdani_ctrl, sugeno_ctrl):
-        self.mamdani = mamdani_ctrl
-        self.sugeno = sugeno_ctrl
+    def __init__(self, mamdani_ctrl=None, sugeno_ctrl=None, physics=None, controllers=None, catalog=None):
+        # Registry of compared controllers, name -> controller, in report order.
+        # The classic pair is registered as 'Mamdani' and 'Sugeno'; controllers adds
+        # any further (name, controller) pairs or a name -> controller dict.
+        self.controllers = {}
+        if mamdani_ctrl is not None:
+            self.register('Mamdani', mamdani_ctrl)
+        if sugeno_ctrl is not None:
+            self.register('Sugeno', sugeno_ctrl)
+        if controllers is not None:
+            for name, controller in dict(controllers).items():
+                self.register(name, controller)
+        # Plant model advancing the zone states (see model/physics.py)
+        self.physics = GreenhousePhysics() if physics is None else physics
+        # Plants the scenarios draw from (model.plants.PlantCatalog); scenario 'plant' values index it
+        self.catalog = CATALOG if catalog is None else catalog
         self.results = []
 
-    def run_random_tests(self, num_tests=20, steps_per_test=50):
+    def register(self, name, controller):
+        """Adds (or replaces) a named controller; every run evaluates all registered controllers."""
+        self.controllers[name] = controller
+        return controller
+
+    def unregister(self, name):
+        return self.controllers.pop(name)
+
+    @property
+    def mamdani(self):
+        return self.controllers.get('Mamdani')
+
+    @property
+    def sugeno(self):
+        return self.controllers.get('Sugeno')
+
+    def run_random_tests(self, num_tests=20, steps_per_test=50, recorder=None, seed=None):
+        """
+        recorder: optional trajectory.TrajectoryRecorder that receives every step
+        (state seen by the controller, its outputs and the resulting error).
+        seed: optional seed for reproducible scenarios (default: global NumPy random state)
+        """
         print(f"Running {num_tests} random simulation tests...")
-        
-        metrics = {
-            'Mamdani': {'avg_response': 0, 'avg_error': 0, 'avg_energy': 0, 'avg_smoothness': 0},
-            'Sugeno': {'avg_response': 0, 'avg_error': 0, 'avg_energy': 0, 'avg_smoothness': 0}
+
+        metrics = None
+        for _, metrics in self.iter_random_tests(num_tests, steps_per_test, recorder=recorder, seed=seed):
+            pass
+        return metrics
+
+    def iter_random_tests(self, num_tests=20, steps_per_test=50, recorder=None, seed=None):
+        """
+        Generator version of run_random_tests for progress reporting. After every finished
+        test it yields (completed_tests, metrics), where metrics are averaged over the tests
+        completed so far; the last one equals the run_random_tests result.
+        """
+        rng = np.random if seed is None else np.random.RandomState(seed)
+
+        # Per-test sums; averaged over the completed tests on every yield
+        totals = {
+            name: {'avg_response': 0, 'avg_error': 0, 'avg_energy': 0, 'avg_smoothness': 0}
+            for name in self.controllers
         }
         
         for i in range(num_tests):
             # Random Plant Selection
-            plant = ALL_PLANTS[np.random.randint(0, len(ALL_PLANTS))]
+            plant = self.catalog.plant(rng.randint(0, len(self.catalog)))
             
             # Random Initial Conditions
             # Start somewhere reasonable but off-target
-            curr_temp = np.random.uniform(5, 45)
-            curr_hum = np.random.uniform(10, 90)
-            curr_growth = np.random.uniform(0, 100)
+            curr_temp = rng.uniform(5, 45)
+            curr_hum = rng.uniform(10, 90)
+            curr_growth = rng.uniform(0, 100)
             
             # Run per controller
-            for ctrl_name, controller in [('Mamdani', self.mamdani), ('Sugeno', self.sugeno)]:
+            for ctrl_name, controller in self.controllers.items():
                 
                 sim_error = 0
                 sim_energy = 0
@@ -41,61 +96,37 @@ class GreenhouseSimulation:
                 # Temp simulation state variables (reset for each controller to compare fairly)
                 sim_temp = curr_temp
                 sim_hum = curr_hum
+                physics_state = self.physics.reset(1)
                 
                 for step in range(steps_per_test):
                     start_time = time.time()
                     
                     # Compute Control Action
-                    # For Mamdani using skfuzzy simulation
-                    # For Sugeno using manual compute
-                    if ctrl_name == 'Mamdani':
-                        res = controller.compute(sim_temp, sim_hum, curr_growth)
-                    else:
-                        res = controller.compute(sim_temp, sim_hum, curr_growth)
+                    # (Mamdani through the skfuzzy simulation, Sugeno through its own compute)
+                    with profiling.stage('simulation.controller'):
+                        if getattr(controller, 'needs_plant', False):
+                            res = controller.compute(sim_temp, sim_hum, curr_growth, plant)
+                        else:
+                            res = controller.compute(sim_temp, sim_hum, curr_growth)
                         
                     end_time = time.time()
                     total_time += (end_time - start_time)
                     
                     hf_out = res['heater_fan']
                     mist_out = res['misting']
+                    state_temp, state_hum = sim_temp, sim_hum
                     
-                    # Physics approximation (Simple Plant Model)
-                    # Heater increases temp, Fan decreases temp & humidity, Misting increases humidity & slight cooling
-                    # This is just for "closed loop" simulation feel
-                    
-                    # 1 unit of Heat = +0.5 deg C
-                    # 1 unit of Cool = -0.5 deg C
-                    # 1 unit of Mist = +1 % Hum, -0.1 deg C
-                    
-                    # Apply physics
-                    temp_change = 0
-                    hum_change = 0
-                    
-                    if hf_out > 0: # Heating
-                         temp_change += (hf_out / 100.0) * 0.5
-                    else: # Cooling
-                         temp_change += (hf_out / 100.0) * 0.5 # hf_out is negative
-                         hum_change += (hf_out / 100.0) * 0.2 # Fan dries slightly
-                         
-                    if mist_out > 0:
-                        hum_change += (mist_out / 100.0) * 1.0
-                        temp_change -= (mist_out / 100.0) * 0.1
-                        
-                    sim_temp += temp_change
-                    sim_hum += hum_change
-                    
-                    # Natural decay towards ambient (say 25C, 50%)
-                    sim_temp += (25 - sim_temp) * 0.05
-                    sim_hum += (50 - sim_hum) * 0.05
-                    
-                    # Clip
-                    sim_temp = np.clip(sim_temp, 0, 50)
-                    sim_hum = np.clip(sim_hum, 0, 100)
+                    # Plant model step (model/physics.py)
+                    with profiling.stage('simulation.physics'):
+                        sim_temp, sim_hum = self.physics.step(sim_temp, sim_hum, hf_out, mist_out, physics_state)
                     
                     # Metrics Calculation
                     # Error: Distance from ideal
                     err = np.sqrt((sim_temp - plant.ideal_temp)**2 + (sim_hum - plant.ideal_humidity)**2)
                     sim_error += err
+
+                    if recorder is not None:
+                        recorder.record(i, ctrl_name, step, state_temp, state_hum, curr_growth, hf_out, mist_out, err)
                     
                     # Energy: Absolute control effort
                     sim_energy += abs(hf_out) + abs(mist_out)
@@ -107,28 +138,239 @@ class GreenhouseSimulation:
                     prev_outputs = [hf_out, mist_out]
                     
                 # Store test average
-                metrics[ctrl_name]['avg_response'] += (total_time / steps_per_test)
-                metrics[ctrl_name]['avg_error'] += (sim_error / steps_per_test)
-                metrics[ctrl_name]['avg_energy'] += (sim_energy / steps_per_test)
-                metrics[ctrl_name]['avg_smoothness'] += (sim_smoothness / steps_per_test)
-
-        # Average over all tests
-        for key in metrics:
-            for m in metrics[key]:
-                metrics[key][m] /= num_tests
-                
+                totals[ctrl_name]['avg_response'] += (total_time / steps_per_test)
+                totals[ctrl_name]['avg_error'] += (sim_error / steps_per_test)
+                totals[ctrl_name]['avg_energy'] += (sim_energy / steps_per_test)
+                totals[ctrl_name]['avg_smoothness'] += (sim_smoothness / steps_per_test)
+
+            # Average over the tests so far
+            yield i + 1, {key: {m: value / (i + 1) for m, value in totals[key].items()} for key in totals}
+
+    def draw_scenarios(self, num_tests, seed=None):
+        """
+        Random test scenarios as arrays: plant index, initial temp/humidity and growth stage.
+        Same distributions as run_random_tests.
+        """
+        rng = np.random.default_rng(seed)
+        return {
+            'plant': rng.integers(0, len(self.catalog), num_tests),
+            'temp': rng.uniform(5, 45, num_tests),
+            'humidity': rng.uniform(10, 90, num_tests),
+            'growth': rng.uniform(0, 100, num_tests)
+        }
+
+    def run_vectorized_tests(self, num_tests=20, steps_per_test=50, seed=None, scenarios=None, controllers=None, recorder=None):
+        """
+        Vectorized version of run_random_tests: all scenarios advance together as state arrays
+        and each controller is called once per step through compute_batch.
+        Returns the same metrics; avg_response is the batch time amortized per scenario and step.
+
+        scenarios: optional dict from draw_scenarios (num_tests/seed are then ignored)
+        controllers: optional list of (name, controller) pairs, defaults to every registered controller
+        recorder: optional trajectory.TrajectoryRecorder, receives one row per scenario and step
+        """
+        if scenarios is None:
+            scenarios = self.draw_scenarios(num_tests, seed)
+        num_tests = len(scenarios['plant'])
+
+        metrics = {}
+        for ctrl_name, per_test in self.evaluate_scenarios(scenarios, steps_per_test, controllers, recorder).items():
+            metrics[ctrl_name] = {
+                'avg_response': per_test['response'] / (steps_per_test * num_tests),
+                'avg_error': float(np.mean(per_test['error'])),
+                'avg_energy': float(np.mean(per_test['energy'])),
+                'avg_smoothness': float(np.mean(per_test['smoothness']))
+            }
+        return metrics
+
+    def evaluate_scenarios(self, scenarios, steps_per_test=50, controllers=None, recorder=None):
+        """
+        Core of run_vectorized_tests. Returns per controller the total compute_batch time
+        ('response', seconds) and per-scenario step averages of 'error', 'energy' and 'smoothness'.
+        """
+        if controllers is None:
+            controllers = list(self.controllers.items())
+        num_tests = len(scenarios['plant'])
+
+        # Scenario arrays are built once (one gather from the catalog) and shared by every controller
+        plant_idx = np.asarray(scenarios['plant'])
+        ideal_temp, ideal_hum = self.catalog.ideal(plant_idx)
+        growth = np.asarray(scenarios['growth'], dtype=float)
+        init_temp = np.array(scenarios['temp'], dtype=float)
+        init_hum = np.array(scenarios['humidity'], dtype=float)
+        test_ids = np.arange(num_tests)
+        zeros = np.zeros(num_tests)
+
+        results = {}
+        for ctrl_name, controller in controllers:
+            # Plant-aware controllers (controllers/profiles.py) also get each scenario's plant,
+            # as indices into this simulation's catalog
+            plant_args = (plant_idx, self.catalog) if getattr(controller, 'needs_plant', False) else ()
+            sim_error = np.zeros(num_tests)
+            sim_energy = np.zeros(num_tests)
+            sim_smoothness = np.zeros(num_tests)
+            total_time = 0
+
+            prev_hf = zeros
+            prev_mist = zeros
+
+            # State arrays (reset for each controller to compare fairly; physics
+            # models return new arrays, so the shared initial state is never modified)
+            sim_temp = init_temp
+            sim_hum = init_hum
+            physics_state = self.physics.reset(num_tests)
+
+            for step in range(steps_per_test):
+                start_time = time.perf_counter()
+                with profiling.stage('simulation.controller'):
+                    res = controller.compute_batch(sim_temp, sim_hum, growth, *plant_args)
+                total_time += time.perf_counter() - start_time
+
+                hf_out = res['heater_fan']
+                mist_out = res['misting']
+
+                state_temp, state_hum = sim_temp, sim_hum
+                with profiling.stage('simulation.physics'):
+                    sim_temp, sim_hum = self.physics.step(sim_temp, sim_hum, hf_out, mist_out, physics_state)
+
+                err = np.sqrt((sim_temp - ideal_temp)**2 + (sim_hum - ideal_hum)**2)
+                sim_error += err
+                if recorder is not None:
+                    recorder.record(test_ids, ctrl_name, step, state_temp, state_hum, growth, hf_out, mist_out, err)
+                sim_energy += np.abs(hf_out) + np.abs(mist_out)
+                sim_smoothness += np.abs(hf_out - prev_hf) + np.abs(mist_out - prev_mist)
+
+                prev_hf, prev_mist = hf_out, mist_out
+
+            results[ctrl_name] = {
+                'response': total_time,
+                'error': sim_error / steps_per_test,
+                'energy': sim_energy / steps_per_test,
+                'smoothness': sim_smoothness / steps_per_test
+            }
+
+        return results
+
+    def run_parallel_tests(self, num_tests=1000, steps_per_test=50, seed=0, max_workers=None, chunk_size=1000,
+                           confidence=0.95, controllers=None, share_controllers=True):
+        """
+        Seeded Monte-Carlo version of run_vectorized_tests spread over a process pool.
+        Tests are cut into fixed chunks of chunk_size and chunk c draws its scenarios from
+        SeedSequence(seed, spawn_key=(c,)), so every test depends only on seed and chunk_size,
+        never on max_workers. Chunk statistics are merged in chunk order (Chan's pairwise
+        update), so results are bit-identical for any worker count; only avg_response, a
+        wall-clock measurement, varies. max_workers=1 evaluates in this process.
+
+        Returns per controller the run_vectorized_tests metrics plus, for error, energy and
+        smoothness, var_* (sample variance across tests) and ci_* ((low, high) normal
+        approximation confidence interval of the mean), and num_tests.
+
+        With share_controllers, the tables of every shareable controller (see
+        controllers/shared.py) are published once in shared memory and the workers attach
+        to them instead of unpickling and rebuilding a copy each.
+        """
+        # Fix the entropy up front so seed=None still gives every chunk the same root
+        entropy = np.random.SeedSequence(seed).entropy
+        tasks = [
+            (entropy, c, min(chunk_size, num_tests - start), steps_per_test, controllers)
+            for c, start in enumerate(range(0, num_tests, chunk_size))
+        ]
+
+        if max_workers == 1:
+            chunk_stats = [_evaluate_chunk(self, *task) for task in tasks]
+        else:
+            # Workers get the simulation without its registry; controllers go with the
+            # tasks, shareable ones as small SharedController handles
+            worker_sim = copy.copy(self)
+            worker_sim.controllers = {}
+            task_controllers = list(self.controllers.items()) if controllers is None else list(controllers)
+            published = []
+            if share_controllers:
+                task_controllers = [
+                    (name, _publish(controller, published)) for name, controller in task_controllers
+                ]
+            tasks = [task[:-1] + (task_controllers,) for task in tasks]
+            try:
+                with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(worker_sim,)) as pool:
+                    chunk_stats = list(pool.map(_evaluate_worker_chunk, tasks))
+            finally:
+                for handle in published:
+                    handle.unlink()
+
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        metrics = {}
+        for ctrl_name in chunk_stats[0]:
+            response = sum(stats[ctrl_name]['response'] for stats in chunk_stats)
+            metrics[ctrl_name] = {'avg_response': response / (steps_per_test * num_tests), 'num_tests': num_tests}
+            for name in ('error', 'energy', 'smoothness'):
+                merged = chunk_stats[0][ctrl_name][name]
+                for stats in chunk_stats[1:]:
+                    merged = _merge_stats(merged, stats[ctrl_name][name])
+                n, mean, m2 = merged
+                var = m2 / (n - 1) if n > 1 else 0.0
+                half_width = z * (var / n) ** 0.5
+                metrics[ctrl_name][f'avg_{name}'] = mean
+                metrics[ctrl_name][f'var_{name}'] = var
+                metrics[ctrl_name][f'ci_{name}'] = (mean - half_width, mean + half_width)
         return metrics
 
     def generate_report(self, metrics):
         print("\n" + "="*50)
         print("PERFORMANCE COMPARISON REPORT")
         print("="*50)
-        print(f"{'Controller':<15} | {'Resp Time (ms)':<15} | {'Avg Error':<10} | {'Energy':<10} | {'Smoothness':<10}")
-        print("-" * 70)
+        width = max([15] + [len(name) for name in metrics])
+        print(f"{'Controller':<{width}} | {'Resp Time (ms)':<15} | {'Avg Error':<10} | {'Energy':<10} | {'Smoothness':<10}")
+        print("-" * (width + 55))
         
-        m = metrics['Mamdani']
-        print(f"{'Mamdani':<15} | {m['avg_response']*1000:<15.4f} | {m['avg_error']:<10.2f} | {m['avg_energy']:<10.2f} | {m['avg_smoothness']:<10.2f}")
-        
-        s = metrics['Sugeno']
-        print(f"{'Sugeno':<15} | {s['avg_response']*1000:<15.4f} | {s['avg_error']:<10.2f} | {s['avg_energy']:<10.2f} | {s['avg_smoothness']:<10.2f}")
-        print("-" * 70)
+        for name, m in metrics.items():
+            print(f"{name:<{width}} | {m['avg_response']*1000:<15.4f} | {m['avg_error']:<10.2f} | {m['avg_energy']:<10.2f} | {m['avg_smoothness']:<10.2f}")
+        print("-" * (width + 55))
+
+# Simulation of each worker process in run_parallel_tests, set once by the pool initializer
+_worker_sim = None
+
+def _init_worker(sim):
+    global _worker_sim
+    _worker_sim = sim
+
+def _evaluate_worker_chunk(task):
+    # Handles attach on first use and keep their controller for later chunks
+    *task, controllers = task
+    controllers = [
+        (name, controller.attach()) if isinstance(controller, SharedController) else (name, controller)
+        for name, controller in controllers
+    ]
+    return _evaluate_chunk(_worker_sim, *task, controllers)
+
+def _publish(controller, published):
+    if not shareable(controller):
+        return controller
+    handle = publish(controller)
+    published.append(handle)
+    return handle
+
+def _evaluate_chunk(sim, entropy, chunk, num_tests, steps_per_test, controllers):
+    """One chunk of run_parallel_tests -> per controller response time and (count, mean, M2) per metric."""
+    scenarios = sim.draw_scenarios(num_tests, np.random.SeedSequence(entropy, spawn_key=(chunk,)))
+    results = sim.evaluate_scenarios(scenarios, steps_per_test, controllers)
+    return {
+        ctrl_name: {
+            'response': per_test['response'],
+            'error': _chunk_stats(per_test['error']),
+            'energy': _chunk_stats(per_test['energy']),
+            'smoothness': _chunk_stats(per_test['smoothness'])
+        }
+        for ctrl_name, per_test in results.items()
+    }
+
+def _chunk_stats(values):
+    mean = float(np.mean(values))
+    return len(values), mean, float(np.sum((values - mean)**2))
+
+def _merge_stats(a, b):
+    """Chan et al. pairwise merge of (count, mean, M2) summaries."""
+    na, mean_a, m2_a = a
+    nb, mean_b, m2_b = b
+    n = na + nb
+    delta = mean_b - mean_a
+    return n, mean_a + delta * nb / n, m2_a + m2_b + delta * delta * na * nb / n
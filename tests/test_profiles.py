@@ -0,0 +1,27 @@
+import numpy as np
+from controllers.profiles import PlantProfiles
+from controllers.sugeno import SugenoController
+from model.plants import Plant, PlantCatalog
+from simulation import GreenhouseSimulation
+
+# One plant that is not the first entry of the default catalog
+CUSTOM = PlantCatalog.from_plants([Plant("Basil", ideal_temp=24, ideal_humidity=55, temp_tolerance=3, humidity_tolerance=8)])
+
+def test_batch_uses_the_given_catalog():
+    profiles = PlantProfiles(SugenoController())
+    rng = np.random.default_rng(0)
+    temps, hums, growths = rng.uniform(0, 50, 50), rng.uniform(0, 100, 50), rng.uniform(0, 100, 50)
+
+    batch = profiles.compute_batch(temps, hums, growths, np.zeros(50, dtype=int), CUSTOM)
+    for i in range(50):
+        scalar = profiles.compute(temps[i], hums[i], growths[i], CUSTOM.plant(0))
+        assert np.isclose(batch['heater_fan'][i], scalar['heater_fan'])
+        assert np.isclose(batch['misting'][i], scalar['misting'])
+
+def test_vectorized_simulation_with_custom_catalog():
+    profiles = PlantProfiles(SugenoController())
+    specialized = profiles.profile(CUSTOM.plant(0))
+    sim = GreenhouseSimulation(controllers={'Profiles': profiles, 'Basil': specialized}, catalog=CUSTOM)
+
+    metrics = sim.run_vectorized_tests(num_tests=20, steps_per_test=10, seed=0)
+    assert np.isclose(metrics['Profiles']['avg_error'], metrics['Basil']['avg_error'])
@@ -0,0 +1,20 @@
+import asyncio
+import numpy as np
+from controllers.profiles import PlantProfiles
+from controllers.sugeno import SugenoController
+from runtime.fake_backend import run_demo
+
+def test_demo_with_plant_profiles():
+    profiles = PlantProfiles(SugenoController())
+    service, greenhouse = asyncio.run(run_demo(profiles, num_zones=30, ticks=3, tick_interval=0.01))
+    assert service.stats.ticks == 3
+    assert service.stats.zones_controlled == 90
+
+    # Commands of one more tick come from each zone's own plant profile
+    commands = asyncio.run(service.tick())
+    assert len(commands) == 30
+    for command in commands:
+        i = greenhouse.index[command.zone_id]
+        expected = profiles.compute(greenhouse.temp[i], greenhouse.humidity[i], greenhouse.growth[i], greenhouse.zones[i].plant)
+        assert np.isclose(command.heater_fan, expected['heater_fan'])
+        assert np.isclose(command.misting, expected['misting'])
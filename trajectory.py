@@ -0,0 +1,158 @@
+import json
+import os
+import numpy as np
+
+# Columns of one trajectory row. temp/humidity/growth are the state the controller saw,
+# heater_fan/misting its outputs and error the distance to ideal after the physics step.
+COLUMNS = [
+    ('test', np.int32),
+    ('controller', np.int16),
+    ('step', np.int32),
+    ('temp', np.float64),
+    ('humidity', np.float64),
+    ('growth', np.float64),
+    ('heater_fan', np.float64),
+    ('misting', np.float64),
+    ('error', np.float64)
+]
+
+META_FILE = 'meta.json'
+
+def _chunk_file(path, column, chunk):
+    return os.path.join(path, f"{column}.{chunk:05d}.npy")
+
+class TrajectoryRecorder:
+    """
+    Streams per-step simulation rows into preallocated typed column buffers and flushes
+    every full chunk to disk as one .npy file per column (columnar layout). Memory stays at
+    chunk_size rows regardless of run length; use TrajectoryReader to read slices back.
+    """
+    def __init__(self, path, chunk_size=65536):
+        self.path = path
+        self.chunk_size = chunk_size
+        os.makedirs(path, exist_ok=True)
+
+        self._buffers = {name: np.empty(chunk_size, dtype=dtype) for name, dtype in COLUMNS}
+        self._fill = 0
+        self.chunk_rows = []        # rows in every flushed chunk
+        self.controllers = []       # controller code -> name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def controller_code(self, name):
+        if name not in self.controllers:
+            self.controllers.append(name)
+        return self.controllers.index(name)
+
+    def record(self, test, controller, step, temp, humidity, growth, heater_fan, misting, error):
+        """
+        Appends one row, or many rows at once when given arrays (scalars are broadcast).
+        controller is the controller's name.
+        """
+        values = np.broadcast_arrays(
+            np.atleast_1d(test), np.atleast_1d(self.controller_code(controller)), np.atleast_1d(step),
+            np.atleast_1d(temp), np.atleast_1d(humidity), np.atleast_1d(growth),
+            np.atleast_1d(heater_fan), np.atleast_1d(misting), np.atleast_1d(error)
+        )
+        n = len(values[0])
+        start = 0
+        while start < n:
+            take = min(n - start, self.chunk_size - self._fill)
+            for (name, _), column in zip(COLUMNS, values):
+                self._buffers[name][self._fill:self._fill + take] = column[start:start + take]
+            self._fill += take
+            start += take
+            if self._fill == self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        """Writes the buffered rows as a new chunk and updates the metadata."""
+        if self._fill:
+            chunk = len(self.chunk_rows)
+            for name, _ in COLUMNS:
+                np.save(_chunk_file(self.path, name, chunk), self._buffers[name][:self._fill])
+            self.chunk_rows.append(self._fill)
+            self._fill = 0
+        self._write_meta()
+
+    def close(self):
+        self.flush()
+
+    def _write_meta(self):
+        meta = {
+            'columns': [[name, np.dtype(dtype).str] for name, dtype in COLUMNS],
+            'chunk_rows': self.chunk_rows,
+            'controllers': self.controllers
+        }
+        tmp = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+
+class TrajectoryReader:
+    """
+    Reads a trajectory written by TrajectoryRecorder. Chunks are memory-mapped, so a slice
+    only touches the chunks and columns it needs.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.columns = [name for name, _ in meta['columns']]
+        self.controllers = meta['controllers']
+        self.chunk_rows = meta['chunk_rows']
+        self._starts = np.concatenate([[0], np.cumsum(self.chunk_rows)]).astype(int)
+
+    def __len__(self):
+        return int(self._starts[-1])
+
+    def _chunk(self, column, chunk):
+        return np.load(_chunk_file(self.path, column, chunk), mmap_mode='r')
+
+    def read(self, start=0, stop=None, columns=None):
+        """Rows [start, stop) as a dict of column arrays."""
+        columns = self.columns if columns is None else columns
+        stop = len(self) if stop is None else min(stop, len(self))
+        out = {name: [] for name in columns}
+        if start >= stop:
+            return {name: np.empty(0, dtype=self._dtype(name)) for name in columns}
+
+        first = int(np.searchsorted(self._starts, start, side='right') - 1)
+        last = int(np.searchsorted(self._starts, stop, side='left'))
+        for chunk in range(first, last):
+            lo = max(start - self._starts[chunk], 0)
+            hi = min(stop - self._starts[chunk], self.chunk_rows[chunk])
+            for name in columns:
+                out[name].append(np.array(self._chunk(name, chunk)[lo:hi]))
+        return {name: np.concatenate(parts) for name, parts in out.items()}
+
+    def iter_chunks(self, columns=None):
+        """Yields one dict of (memory-mapped) column arrays per chunk."""
+        columns = self.columns if columns is None else columns
+        for chunk in range(len(self.chunk_rows)):
+            yield {name: self._chunk(name, chunk) for name in columns}
+
+    def select(self, test=None, controller=None, columns=None):
+        """
+        Rows of one test and/or controller (name), scanning chunk by chunk so memory stays
+        bounded by the size of the selection.
+        """
+        columns = self.columns if columns is None else columns
+        code = self.controllers.index(controller) if controller is not None else None
+        out = {name: [] for name in columns}
+        for chunk in self.iter_chunks(sorted(set(columns) | {'test', 'controller'})):
+            mask = np.ones(len(chunk['test']), dtype=bool)
+            if test is not None:
+                mask &= chunk['test'] == test
+            if code is not None:
+                mask &= chunk['controller'] == code
+            for name in columns:
+                out[name].append(np.asarray(chunk[name][mask]))
+        return {name: np.concatenate(parts) if parts else np.empty(0, dtype=self._dtype(name)) for name, parts in out.items()}
+
+    def _dtype(self, name):
+        return dict(COLUMNS)[name]